@@ -4,10 +4,19 @@ Blog: https://aws.amazon.com/blogs/aws-cloud-financial-management/discovering-an
 """
 
 import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import RefreshableCredentials
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import Counter
+from datetime import datetime, timezone
+import csv
+import json
 import os
 import sys
 import argparse
+import threading
 import time
 import logging
 
@@ -28,16 +37,110 @@ parser.add_argument(
 )
 
 parser.add_argument(
-    "--profile", required=True, help="The AWS profile to use. This is required."
+    "--profile",
+    help="The AWS profile to use. With --org-role, the profile of the organization's management account.",
+)
+
+parser.add_argument(
+    "--profiles",
+    nargs="+",
+    metavar="PROFILE",
+    help="Run --all or --audit on the account of each profile, with one aggregated report.",
+)
+
+parser.add_argument(
+    "--org-role",
+    metavar="ROLE",
+    help="Run --all or --audit on every active account of the organization of --profile, "
+    "assuming the role ROLE in each of them.",
+)
+
+parser.add_argument(
+    "--account-workers",
+    type=int,
+    default=4,
+    help="Number of accounts processed in parallel with --profiles or --org-role. Defaults to 4.",
+)
+
+parser.add_argument(
+    "--account-rate",
+    type=float,
+    default=0,
+    help="Maximum S3 requests per second in each account, 0 for no limit. Defaults to 0.",
+)
+
+parser.add_argument(
+    "--all",
+    action="store_true",
+    help="Check every bucket of the account without prompting, then print a summary.",
+)
+
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=16,
+    help="Number of buckets processed in parallel with --all. Defaults to 16.",
+)
+
+parser.add_argument(
+    "--max-attempts",
+    type=int,
+    default=10,
+    help="Attempts per S3 call, throttled calls are retried with adaptive backoff. Defaults to 10.",
+)
+
+parser.add_argument(
+    "--checkpoint",
+    help="File recording the buckets already done with --all, skipped on a rerun. "
+    "Defaults to s3-incomplete-mpu-<profile>.checkpoint. Delete it to start over. "
+    "With several accounts, the directory of one checkpoint per account.",
+)
+
+parser.add_argument(
+    "--audit",
+    action="store_true",
+    help="Measure the bytes held by incomplete MPUs in every bucket and write a report, no lifecycle rule is added.",
+)
+
+parser.add_argument(
+    "--report",
+    help="Report of --audit, CSV or, with pyarrow installed, .parquet. "
+    "Defaults to s3-incomplete-mpu-<profile>-audit.csv, or s3-incomplete-mpu-accounts-audit.csv "
+    "with several accounts. With several accounts and --all, the summary per account, "
+    "s3-incomplete-mpu-accounts.csv by default.",
+)
+
+parser.add_argument(
+    "--abort-older-than",
+    type=int,
+    metavar="DAYS",
+    help="With --audit, abort the incomplete MPUs initiated more than DAYS days ago.",
 )
 
 args = parser.parse_args()
+if not (args.profile or args.profiles):
+    parser.error("one of --profile or --profiles is required")
+if args.profiles and (args.profile or args.org_role):
+    parser.error("--profiles cannot be combined with --profile or --org-role")
+if args.org_role and not args.profile:
+    parser.error("--org-role needs --profile, the management account")
+# Several accounts, processed in parallel without any prompt
+MULTI_ACCOUNT = bool(args.profiles or args.org_role)
+if MULTI_ACCOUNT and not (args.all or args.audit):
+    parser.error("--profiles and --org-role need --all or --audit")
 
 logger.info(f"Running in dry run mode: {args.dry_run}")
-logger.info(f"Using AWS profile: {args.profile}")
+logger.info(f"Using AWS profile: {args.profile or ', '.join(args.profiles)}")
 
-session = boto3.Session(profile_name=args.profile)
-s3_client = session.client("s3")
+# Adaptive retries back off client side when S3 throttles (SlowDown, 503),
+# the pool has a connection per worker thread and TCP keep-alive keeps the
+# idle connections (and their TLS sessions) open between buckets. The audit
+# runs two pools of --workers threads, the bucket one and the upload one
+client_config = Config(
+    retries={"mode": "adaptive", "max_attempts": args.max_attempts},
+    max_pool_connections=max(10, args.workers * (2 if args.audit else 1)),
+    tcp_keepalive=True,
+)
 
 
 # Flag to run in dry run. No changes will be done to the buckets
@@ -55,89 +158,765 @@ rule = {
     ]
 }
 
+# Outcomes of get_incomplete_mpu_policy
+COMPLIANT = "compliant"
+PATCHED = "patched"
+WOULD_PATCH = "would_patch"
+FAILED = "failed"
+# Outcomes recorded in the checkpoint, nothing left to do for these buckets
+DONE = (COMPLIANT, PATCHED)
+
+
+class RateLimiter:
+    """Token bucket shared by the threads of an account.
+
+    Args:
+        rate (float): Requests per second, up to a second of them at once.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-def create_incomplete_mpu_policy(bucket: str) -> dict:
+    def acquire(self, **kwargs) -> None:
+        """Wait for a token, called by botocore before every request."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Account:
+    """The S3 clients of an AWS account and the regions of its buckets.
+
+    Args:
+        label (str): Name of the account in the logs and the reports.
+        session (boto3.Session): Session with the credentials of the account.
+        rate (float, optional): Maximum S3 requests per second, 0 for no limit.
+    """
+
+    def __init__(self, label: str, session, rate: float = 0):
+        self.label = label
+        self.session = session
+        self.limiter = RateLimiter(rate) if rate else None
+        # boto3 sessions are not thread safe, clients are created under the lock
+        self.lock = threading.Lock()
+        # Client of the session's region, lists the buckets and resolves their regions
+        self.s3_client = self._new_client()
+        # One client per bucket region, calls to a bucket go straight to its region
+        # instead of being redirected there
+        self.regional_clients = {self.s3_client.meta.region_name: self.s3_client}
+        # Bucket name to region, filled from list_buckets and get_bucket_location
+        self.bucket_regions = {}
+
+    def _new_client(self, region: str = None):
+        client = self.session.client("s3", region_name=region, config=client_config)
+        if self.limiter is not None:
+            # Every HTTP request, retries included, takes a token of the account
+            client.meta.events.register("before-send.s3", self.limiter.acquire)
+        return client
+
+    def list_buckets(self) -> list:
+        """Return the buckets of the account, noting the regions they come with."""
+        # Paginated, accounts can have more buckets than a single page holds
+        buckets = [
+            bucket
+            for page in self.s3_client.get_paginator("list_buckets").paginate()
+            for bucket in page["Buckets"]
+        ]
+        # The listing gives the region of every bucket, no lookup needed for these
+        self.bucket_regions.update(
+            {
+                bucket["Name"]: bucket["BucketRegion"]
+                for bucket in buckets
+                if bucket.get("BucketRegion")
+            }
+        )
+        return buckets
+
+    def get_bucket_region(self, bucket: str) -> str:
+        """Return the region of a bucket, asking S3 only the first time.
+
+        Args:
+            bucket (str): The name of the bucket.
+
+        Returns:
+            str: The region, e.g. eu-west-1.
+        """
+        region = self.bucket_regions.get(bucket)
+        if region is not None:
+            return region
+        s3_client = self.s3_client
+        try:
+            location = s3_client.get_bucket_location(Bucket=bucket)[
+                "LocationConstraint"
+            ]
+            # Buckets of us-east-1 have no location constraint, EU is the old name of eu-west-1
+            region = {None: "us-east-1", "": "us-east-1", "EU": "eu-west-1"}.get(
+                location, location
+            )
+        except ClientError as error:
+            # HeadBucket responses, errors included, carry the region of the
+            # bucket. botocore follows the redirect to another region, the
+            # region of the client is not the bucket's one
+            try:
+                response = s3_client.head_bucket(Bucket=bucket)
+            except ClientError as head_error:
+                response = head_error.response
+            headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+            region = response.get("BucketRegion") or headers.get("x-amz-bucket-region")
+            if region is None:
+                raise error
+        self.bucket_regions[bucket] = region
+        return region
+
+    def get_s3_client(self, bucket: str):
+        """Return the client of the region of a bucket, creating it the first time.
+
+        Args:
+            bucket (str): The name of the bucket.
+
+        Returns:
+            S3.Client: A client of the bucket's region, shared by all the threads.
+        """
+        region = self.get_bucket_region(bucket)
+        client = self.regional_clients.get(region)
+        if client is None:
+            with self.lock:
+                client = self.regional_clients.get(region)
+                if client is None:
+                    client = self._new_client(region)
+                    self.regional_clients[region] = client
+        return client
+
+
+def assume_role_session(sts_client, role_arn: str, region: str = None):
+    """Return a session on a role of another account.
+
+    The credentials of the role are kept until they are about to expire, then
+    botocore assumes the role again, so a long run never uses expired ones.
+
+    Args:
+        sts_client (STS.Client): Client of the account allowed to assume the role.
+        role_arn (str): ARN of the role to assume.
+        region (str, optional): Default region of the session.
+
+    Returns:
+        boto3.Session: A session of the account of the role.
+    """
+
+    def fetch_credentials():
+        credentials = sts_client.assume_role(
+            RoleArn=role_arn, RoleSessionName="s3-incomplete-mpu"
+        )["Credentials"]
+        return {
+            "access_key": credentials["AccessKeyId"],
+            "secret_key": credentials["SecretAccessKey"],
+            "token": credentials["SessionToken"],
+            "expiry_time": credentials["Expiration"].isoformat(),
+        }
+
+    botocore_session = botocore.session.Session()
+    botocore_session._credentials = RefreshableCredentials.create_from_metadata(
+        metadata=fetch_credentials(),
+        refresh_using=fetch_credentials,
+        method="sts-assume-role",
+    )
+    return boto3.Session(botocore_session=botocore_session, region_name=region)
+
+
+def get_accounts() -> list:
+    """Return the accounts to process, as (label, session factory) pairs.
+
+    The sessions are made by the account threads, the roles of an
+    organization are assumed in parallel.
+
+    Returns:
+        list: A pair per profile of --profiles, or per active account of the
+            organization with --org-role.
+    """
+    if args.profiles:
+        return [
+            (profile, lambda profile=profile: boto3.Session(profile_name=profile))
+            for profile in args.profiles
+        ]
+
+    base_session = boto3.Session(profile_name=args.profile)
+    sts_client = base_session.client("sts")
+    identity = sts_client.get_caller_identity()
+    partition = identity["Arn"].split(":")[1]
+    organizations = base_session.client("organizations")
+    accounts = []
+    for page in organizations.get_paginator("list_accounts").paginate():
+        for account in page["Accounts"]:
+            if account["Status"] != "ACTIVE":
+                continue
+            if account["Id"] == identity["Account"]:
+                # The management account itself, no role to assume
+                accounts.append((account["Id"], lambda: base_session))
+                continue
+            role_arn = f"arn:{partition}:iam::{account['Id']}:role/{args.org_role}"
+            accounts.append(
+                (
+                    account["Id"],
+                    lambda role_arn=role_arn: assume_role_session(
+                        sts_client, role_arn, base_session.region_name
+                    ),
+                )
+            )
+    logger.info(f"Found {len(accounts)} active accounts in the organization")
+    return accounts
+
+
+def get_checkpoint_path(label: str) -> str:
+    """Return the checkpoint file of an account, see --checkpoint."""
+    if not MULTI_ACCOUNT:
+        return args.checkpoint or f"s3-incomplete-mpu-{label}.checkpoint"
+    directory = args.checkpoint or "."
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"s3-incomplete-mpu-{label}.checkpoint")
+
+
+def create_incomplete_mpu_policy(account: Account, bucket: str) -> dict:
     """Function that calls the S3 API and puts a lifecycle configuration on the bucket passed to it
         and returns the lifecycle policy id to the caller
 
     Args:
+        account (Account): The account of the bucket.
         bucket (str): The name of the bucket to apply the configuration onto.
 
     Returns:
         response (dict): Dictionary containing the information of the Lifecycle Rule created.
     """
 
-    response = s3_client.put_bucket_lifecycle_configuration(
+    response = account.get_s3_client(bucket).put_bucket_lifecycle_configuration(
         Bucket=bucket, LifecycleConfiguration=rule
     )
     return response
 
 
-def get_incomplete_mpu_policy(bucket: str):
+def get_incomplete_mpu_policy(account: Account, bucket: str) -> str:
     """Given a bucket 'bucket' check if it has Lifecycle rules, in specific MPU Lifecycle rules.
         If there aren't any Lifecycle rules create an MPU Lifecycle rule. If there are other
         Lifecycle rules, check first to ensure none of the rules is an MPU rule, by checking
         if a rule with a statement 'AbortIncompleteMultipartUpload' exist.
 
     Args:
+        account (Account): The account of the bucket.
         bucket (str): bucket name to check and/or create rule.
+
+    Raises:
+        ClientError: The lifecycle rules of the bucket could not be read or written.
+
+    Returns:
+        str: COMPLIANT, PATCHED, or WOULD_PATCH in dry run mode.
     """
 
     # Check if there are lifecycle rules created on the bucket. Will return with ClientError if no rules configured on the bucket
     try:
-        bucket_lifecycle = s3_client.get_bucket_lifecycle_configuration(Bucket=bucket)
-    except ClientError:
+        bucket_lifecycle = account.get_s3_client(
+            bucket
+        ).get_bucket_lifecycle_configuration(Bucket=bucket)
+    except ClientError as error:
+        # Anything else (AccessDenied...) must not be taken for a bucket without rules
+        if error.response["Error"]["Code"] != "NoSuchLifecycleConfiguration":
+            raise
+
         # This means there are no lifecycle rules for the bucket. Create one
         logger.info(
             f"No Incomplete MPU rule exist for this bucket: {bucket}...Adding one"
         )
 
         if not DRY_RUN:
-            response = create_incomplete_mpu_policy(bucket=bucket)
+            response = create_incomplete_mpu_policy(account, bucket=bucket)
 
             # If there's a response, the rule was created
             if response is not None:
                 logger.info(f"Lifecycle created for bucket {bucket}: \n{response}")
+            return PATCHED
         else:
             logger.info("No changes done...Running in Dry run mode")
+            return WOULD_PATCH
 
     # If there are already Lifecycle rules create for the bucket, check if the rules contain an Incomplete MPU rule
-    else:
+    logger.info(
+        f"Bucket {bucket} has already created Lifecycle Rules: \nChecking if there is an Incomplete MPU rule in place..."
+    )
+
+    # Check if any existing rule has AbortIncompleteMultipartUpload
+    for existing_rule in bucket_lifecycle["Rules"]:
+        if existing_rule.get("AbortIncompleteMultipartUpload"):
+            logger.info(
+                f"The following Incomplete MPU rule already exists: {existing_rule.get('ID')}. Nothing to do."
+            )
+            return COMPLIANT
+
+    # If no MPU rule was found, create one
+    logger.info(f"No Incomplete MPU rule exists for this bucket: {bucket}...Adding one")
+
+    if DRY_RUN:
+        logger.info(f"Not changing bucket {bucket}. Running in DRY RUN Mode")
+        return WOULD_PATCH
+
+    # Append our rule to existing rules
+    updated_lifecycle = {"Rules": bucket_lifecycle["Rules"] + rule["Rules"]}
+
+    response = account.get_s3_client(bucket).put_bucket_lifecycle_configuration(
+        Bucket=bucket, LifecycleConfiguration=updated_lifecycle
+    )
+    logger.info(
+        f"Incomplete MPU Lifecycle rule created for bucket {bucket}: \n{response}"
+    )
+    return PATCHED
+
+
+def load_checkpoint(path: str) -> dict:
+    """Read the buckets already done by a previous run.
+
+    Args:
+        path (str): The checkpoint file, one JSON object per line.
+
+    Returns:
+        dict: Bucket name to outcome, only the ones in DONE.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as checkpoint:
+        for line in checkpoint:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Line cut short by an interrupted run
+                continue
+            if entry.get("status") in DONE:
+                done[entry["bucket"]] = entry["status"]
+    return done
+
+
+def process_all_buckets(
+    account: Account, buckets: list, workers: int, checkpoint_path: str
+) -> Counter:
+    """Check and patch every bucket on a pool of threads.
+
+    Buckets found in the checkpoint are skipped, every bucket done is appended
+    to it as soon as it completes. Dry runs neither read nor write it.
+
+    Args:
+        account (Account): The account of the buckets.
+        buckets (list): Names of the buckets.
+        workers (int): Number of buckets processed at the same time.
+        checkpoint_path (str): The checkpoint file.
+
+    Returns:
+        Counter: Number of buckets per outcome, "skipped" for the checkpointed ones.
+    """
+    summary = Counter()
+    failures = {}
+    done = {} if DRY_RUN else load_checkpoint(checkpoint_path)
+    pending = [bucket for bucket in buckets if bucket not in done]
+    summary["skipped"] = len(buckets) - len(pending)
+    if summary["skipped"]:
         logger.info(
-            f"Bucket {bucket} has already created Lifecycle Rules: \nChecking if there is an Incomplete MPU rule in place..."
+            f"Skipping {summary['skipped']} buckets already done, see {checkpoint_path}"
         )
 
-        # Check if any existing rule has AbortIncompleteMultipartUpload
-        mpu_rule_exists = False
-        for rule in bucket_lifecycle["Rules"]:
-            if rule.get("AbortIncompleteMultipartUpload"):
-                logger.info(
-                    f"The following Incomplete MPU rule already exists: {rule['ID']}. Nothing to do."
-                )
-                mpu_rule_exists = True
-                break
+    checkpoint = None if DRY_RUN else open(checkpoint_path, "a")
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(get_incomplete_mpu_policy, account, bucket): bucket
+                for bucket in pending
+            }
+            for count, future in enumerate(as_completed(futures), start=1):
+                bucket = futures[future]
+                try:
+                    status = future.result()
+                except Exception as error:
+                    logger.error(f"Bucket {bucket} failed: {error}")
+                    status = FAILED
+                    failures[bucket] = str(error)
+                summary[status] += 1
+                if checkpoint is not None and status in DONE:
+                    checkpoint.write(
+                        json.dumps({"bucket": bucket, "status": status}) + "\n"
+                    )
+                    checkpoint.flush()
+                if count % 100 == 0:
+                    logger.info(
+                        f"Account {account.label}: processed {count}/{len(pending)} buckets"
+                    )
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    logger.info(
+        f"Account {account.label}: checked {len(pending)} buckets in "
+        f"{time.monotonic() - started:.1f}s with {workers} workers"
+    )
+    for bucket, error in sorted(failures.items()):
+        logger.info(f"Failed: {account.label}: {bucket}: {error}")
+    return summary
+
+
+def print_summary(summary: Counter) -> None:
+    """Log the number of buckets per outcome of process_all_buckets."""
+    checked = sum(summary[status] for status in (COMPLIANT, PATCHED, WOULD_PATCH))
+    logger.info("Summary:")
+    logger.info(f"  Checked:           {checked + summary[FAILED]}")
+    logger.info(f"  Already compliant: {summary[COMPLIANT]}")
+    if DRY_RUN:
+        logger.info(f"  Would be patched:  {summary[WOULD_PATCH]}")
+    else:
+        logger.info(f"  Patched:           {summary[PATCHED]}")
+    logger.info(f"  Failed:            {summary[FAILED]}")
+    logger.info(f"  Skipped (checkpoint): {summary['skipped']}")
+
+
+# Age thresholds of the audit, in days, reported as bytes_over_<days>d
+AGE_THRESHOLDS = (1, 7, 30)
+# Aborts submitted to the pool at a time
+ABORT_BATCH_SIZE = 100
+REPORT_FIELDS = [
+    "account",
+    "bucket",
+    "region",
+    "mpu_rule",
+    "uploads",
+    "parts",
+    "bytes",
+    *[f"bytes_over_{days}d" for days in AGE_THRESHOLDS],
+    "oldest_initiated",
+    "aborted_uploads",
+    "aborted_bytes",
+    "error",
+]
+
+
+def has_incomplete_mpu_rule(account: Account, bucket: str) -> bool:
+    """Tell if a bucket has a lifecycle rule aborting incomplete MPUs."""
+    try:
+        lifecycle = account.get_s3_client(bucket).get_bucket_lifecycle_configuration(
+            Bucket=bucket
+        )
+    except ClientError as error:
+        if error.response["Error"]["Code"] == "NoSuchLifecycleConfiguration":
+            return False
+        raise
+    return any(
+        existing_rule.get("AbortIncompleteMultipartUpload")
+        for existing_rule in lifecycle["Rules"]
+    )
+
 
-        # If no MPU rule was found, create one
-        if not mpu_rule_exists:
+def get_upload_size(account: Account, bucket: str, upload: dict) -> tuple:
+    """Return the number of parts of an incomplete MPU and their total size.
+
+    None if the upload was completed or aborted since it was listed.
+    """
+    parts = size = 0
+    paginator = account.get_s3_client(bucket).get_paginator("list_parts")
+    try:
+        for page in paginator.paginate(
+            Bucket=bucket, Key=upload["Key"], UploadId=upload["UploadId"]
+        ):
+            for part in page.get("Parts", []):
+                parts += 1
+                size += part["Size"]
+    except ClientError as error:
+        if error.response["Error"]["Code"] != "NoSuchUpload":
+            raise
+        return None
+    return parts, size
+
+
+def abort_upload(account: Account, bucket: str, upload: dict) -> None:
+    account.get_s3_client(bucket).abort_multipart_upload(
+        Bucket=bucket, Key=upload["Key"], UploadId=upload["UploadId"]
+    )
+
+
+def audit_bucket(
+    account: Account, bucket: str, parts_executor, abort_days: int = None
+) -> dict:
+    """Sum the bytes of the incomplete MPUs of a bucket by age.
+
+    The parts of the uploads are listed concurrently on parts_executor, the
+    uploads older than abort_days are aborted on it in batches.
+
+    Args:
+        account (Account): The account of the bucket.
+        bucket (str): The name of the bucket.
+        parts_executor (ThreadPoolExecutor): Pool running the per upload calls.
+        abort_days (int, optional): Abort the uploads older than this many days.
+
+    Returns:
+        dict: A row of the report, see REPORT_FIELDS.
+    """
+    row = dict.fromkeys(REPORT_FIELDS, 0)
+    row.update(
+        account=account.label,
+        bucket=bucket,
+        region=account.get_bucket_region(bucket),
+        error="",
+    )
+    row["oldest_initiated"] = ""
+    row["mpu_rule"] = has_incomplete_mpu_rule(account, bucket)
+
+    uploads = [
+        upload
+        for page in account.get_s3_client(bucket)
+        .get_paginator("list_multipart_uploads")
+        .paginate(Bucket=bucket)
+        for upload in page.get("Uploads", [])
+    ]
+    sizes = parts_executor.map(
+        lambda upload: get_upload_size(account, bucket, upload), uploads
+    )
+
+    now = datetime.now(timezone.utc)
+    expired = []
+    for upload, upload_size in zip(uploads, sizes):
+        # Gone already, nothing left to count or abort
+        if upload_size is None:
+            continue
+        parts, size = upload_size
+        age_days = (now - upload["Initiated"]).total_seconds() / 86400
+        row["uploads"] += 1
+        row["parts"] += parts
+        row["bytes"] += size
+        for days in AGE_THRESHOLDS:
+            if age_days > days:
+                row[f"bytes_over_{days}d"] += size
+        initiated = upload["Initiated"].isoformat()
+        if not row["oldest_initiated"] or initiated < row["oldest_initiated"]:
+            row["oldest_initiated"] = initiated
+        if abort_days is not None and age_days > abort_days:
+            expired.append((upload, size))
+
+    for start in range(0, len(expired), ABORT_BATCH_SIZE):
+        batch = expired[start : start + ABORT_BATCH_SIZE]
+        if DRY_RUN:
             logger.info(
-                f"No Incomplete MPU rule exists for this bucket: {bucket}...Adding one"
+                f"Would abort {len(batch)} uploads of bucket {bucket} of {account.label}"
             )
+            continue
+        results = [
+            (parts_executor.submit(abort_upload, account, bucket, upload), size)
+            for upload, size in batch
+        ]
+        for future, size in results:
+            # An upload completed or aborted since it was listed is gone already
+            try:
+                future.result()
+            except ClientError as error:
+                if error.response["Error"]["Code"] != "NoSuchUpload":
+                    raise
+                continue
+            row["aborted_uploads"] += 1
+            row["aborted_bytes"] += size
+    return row
 
-            if not DRY_RUN:
-                # Append our rule to existing rules
-                existing_rules = bucket_lifecycle["Rules"]
-                existing_rules.append(rule["Rules"][0])
 
-                updated_lifecycle = {"Rules": existing_rules}
+def audit_buckets(
+    account: Account, buckets: list, workers: int, abort_days: int = None
+) -> list:
+    """Audit every bucket, buckets and uploads in parallel.
 
-                response = s3_client.put_bucket_lifecycle_configuration(
-                    Bucket=bucket, LifecycleConfiguration=updated_lifecycle
-                )
-                logger.info(
-                    f"Incomplete MPU Lifecycle rule created for bucket {bucket}: \n{response}"
-                )
-            else:
-                logger.info(f"Not changing bucket {bucket}. Running in DRY RUN Mode")
+    Args:
+        account (Account): The account of the buckets.
+        buckets (list): Names of the buckets.
+        workers (int): Number of buckets, and of upload calls, at the same time.
+        abort_days (int, optional): Abort the uploads older than this many days.
+
+    Returns:
+        list: The rows of the report, the buckets holding the most bytes first.
+    """
+    rows = []
+    # Two pools, the bucket threads wait on the upload calls without
+    # taking their threads
+    with ThreadPoolExecutor(max_workers=workers) as parts_executor:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    audit_bucket, account, bucket, parts_executor, abort_days
+                ): bucket
+                for bucket in buckets
+            }
+            for count, future in enumerate(as_completed(futures), start=1):
+                bucket = futures[future]
+                try:
+                    rows.append(future.result())
+                except Exception as error:
+                    logger.error(f"Bucket {bucket} of {account.label} failed: {error}")
+                    row = dict.fromkeys(REPORT_FIELDS, 0)
+                    row.update(
+                        account=account.label,
+                        bucket=bucket,
+                        region=account.bucket_regions.get(bucket, ""),
+                        mpu_rule=None,
+                        oldest_initiated="",
+                        error=str(error),
+                    )
+                    rows.append(row)
+                if count % 100 == 0:
+                    logger.info(
+                        f"Account {account.label}: audited {count}/{len(buckets)} buckets"
+                    )
+    rows.sort(key=lambda row: row["bytes"], reverse=True)
+    return rows
+
+
+def write_report(rows: list, path: str, fields: list = REPORT_FIELDS) -> None:
+    """Write the rows of a report as CSV, or as Parquet for a .parquet path."""
+    if path.endswith(".parquet"):
+        # Optional dependency, only needed for this format
+        import pyarrow
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+        return
+    with open(path, "w", newline="") as report:
+        writer = csv.DictWriter(report, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_audit(rows: list, top: int = 10) -> None:
+    """Log the totals of the audit and the buckets holding the most bytes."""
+    measured = [row for row in rows if not row["error"]]
+    logger.info("Audit summary:")
+    logger.info(f"  Buckets audited:   {len(measured)}")
+    logger.info(f"  Buckets failed:    {len(rows) - len(measured)}")
+    logger.info(f"  Incomplete MPUs:   {sum(row['uploads'] for row in measured)}")
+    logger.info(f"  Bytes:             {sum(row['bytes'] for row in measured)}")
+    for days in AGE_THRESHOLDS:
+        total = sum(row[f"bytes_over_{days}d"] for row in measured)
+        logger.info(f"  Bytes over {days:>2}d:    {total}")
+    if args.abort_older_than is not None and not DRY_RUN:
+        logger.info(
+            f"  Aborted:           {sum(row['aborted_uploads'] for row in measured)} "
+            f"uploads, {sum(row['aborted_bytes'] for row in measured)} bytes"
+        )
+    for row in measured[:top]:
+        if row["bytes"]:
+            bucket = (
+                f"{row['account']}/{row['bucket']}" if MULTI_ACCOUNT else row["bucket"]
+            )
+            logger.info(
+                f"  {bucket}: {row['bytes']} bytes in {row['uploads']} uploads "
+                f"(MPU rule: {'yes' if row['mpu_rule'] else 'no'})"
+            )
+
+
+SUMMARY_FIELDS = [
+    "account",
+    "buckets",
+    COMPLIANT,
+    PATCHED,
+    WOULD_PATCH,
+    FAILED,
+    "skipped",
+    "error",
+]
+
+
+def run_account(label: str, make_session):
+    """Run --all or --audit on every bucket of an account.
+
+    Args:
+        label (str): Name of the account in the logs and the reports.
+        make_session (callable): Returns the boto3 session of the account.
+
+    Returns:
+        list or Counter: The audit rows, or the outcomes of process_all_buckets.
+    """
+    account = Account(label, make_session(), args.account_rate)
+    buckets = [bucket["Name"] for bucket in account.list_buckets()]
+    logger.info(f"Account {label}: {len(buckets)} buckets")
+    if args.audit:
+        return audit_buckets(account, buckets, args.workers, args.abort_older_than)
+    return process_all_buckets(
+        account, buckets, args.workers, get_checkpoint_path(label)
+    )
+
+
+def process_accounts(accounts: list, workers: int) -> dict:
+    """Run run_account on several accounts in parallel.
+
+    Each account has its own clients, bucket pools and rate limit, an account
+    that fails (e.g. the role cannot be assumed) does not stop the others.
+
+    Args:
+        accounts (list): (label, session factory) pairs, see get_accounts.
+        workers (int): Number of accounts processed at the same time.
+
+    Returns:
+        dict: Label of the account to the result of run_account, or to the
+            exception that stopped it.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_account, label, make_session): label
+            for label, make_session in accounts
+        }
+        for future in as_completed(futures):
+            label = futures[future]
+            try:
+                results[label] = future.result()
+            except Exception as error:
+                logger.error(f"Account {label} failed: {error}")
+                results[label] = error
+    return results
+
+
+def aggregate_audits(results: dict) -> list:
+    """Merge the audit rows of the accounts, a row per account that failed."""
+    rows = []
+    for label, result in results.items():
+        if isinstance(result, Exception):
+            row = dict.fromkeys(REPORT_FIELDS, 0)
+            row.update(
+                account=label,
+                bucket="",
+                region="",
+                mpu_rule=None,
+                oldest_initiated="",
+                error=str(result),
+            )
+            rows.append(row)
+        else:
+            rows.extend(result)
+    rows.sort(key=lambda row: row["bytes"], reverse=True)
+    return rows
+
+
+def aggregate_summaries(results: dict) -> list:
+    """Return a row of SUMMARY_FIELDS per account of process_accounts."""
+    rows = []
+    for label, result in sorted(results.items()):
+        row = dict.fromkeys(SUMMARY_FIELDS, 0)
+        row.update(account=label, error="")
+        if isinstance(result, Exception):
+            row["error"] = str(result)
+        else:
+            row.update({status: result[status] for status in SUMMARY_FIELDS[2:-1]})
+            row["buckets"] = sum(result[status] for status in SUMMARY_FIELDS[2:-1])
+        rows.append(row)
+    return rows
 
 
 if __name__ == "__main__":
@@ -150,6 +929,11 @@ if __name__ == "__main__":
         )
         time.sleep(1)
         print()
+    elif args.all or args.audit:
+        # Non-interactive, the flag is the confirmation
+        logger.info(
+            "\033[91mRunning in LIVE mode. Changes will be done to the buckets\033[0m"
+        )
     else:
         logger.info(
             "\033[91mRunning in LIVE mode. Changes will be done to the buckets\033[0m"
@@ -164,8 +948,61 @@ if __name__ == "__main__":
             logger.info(f"Exiting...Goodbye!")
             sys.exit(0)
 
+    if MULTI_ACCOUNT:
+        results = process_accounts(get_accounts(), args.account_workers)
+        if args.audit:
+            rows = aggregate_audits(results)
+            report_path = args.report or "s3-incomplete-mpu-accounts-audit.csv"
+            write_report(rows, report_path)
+            print_audit(rows)
+            failed = any(row["error"] for row in rows)
+        else:
+            rows = aggregate_summaries(results)
+            report_path = args.report or "s3-incomplete-mpu-accounts.csv"
+            write_report(rows, report_path, SUMMARY_FIELDS)
+            summary = Counter()
+            for result in results.values():
+                if not isinstance(result, Exception):
+                    summary.update(result)
+            print_summary(summary)
+            failed_accounts = [row["account"] for row in rows if row["error"]]
+            logger.info(f"  Accounts failed:   {len(failed_accounts)}")
+            for label in failed_accounts:
+                logger.info(f"Failed account: {label}: {results[label]}")
+            failed = any(row["error"] or row[FAILED] for row in rows)
+        logger.info(f"Report written to {report_path}")
+        sys.exit(1 if failed else 0)
+
+    account = Account(
+        args.profile, boto3.Session(profile_name=args.profile), args.account_rate
+    )
+    checkpoint_path = get_checkpoint_path(args.profile)
+
     print("Getting all buckets in the account...\n")
-    buckets = s3_client.list_buckets()["Buckets"]
+    buckets = account.list_buckets()
+
+    if args.audit:
+        rows = audit_buckets(
+            account,
+            [bucket["Name"] for bucket in buckets],
+            args.workers,
+            args.abort_older_than,
+        )
+        report_path = args.report or f"s3-incomplete-mpu-{args.profile}-audit.csv"
+        write_report(rows, report_path)
+        print_audit(rows)
+        logger.info(f"Report written to {report_path}")
+        sys.exit(1 if any(row["error"] for row in rows) else 0)
+
+    if args.all:
+        summary = process_all_buckets(
+            account,
+            [bucket["Name"] for bucket in buckets],
+            args.workers,
+            checkpoint_path,
+        )
+        print_summary(summary)
+        sys.exit(1 if summary[FAILED] else 0)
 
     # for bucket_name in buckets:
     run = True
@@ -191,15 +1028,15 @@ if __name__ == "__main__":
 
             if modify_buckets == "y":
                 logger.info("Applying Lifecycle rule to all buckets...")
-                for bucket_name in buckets:
-                    logger.info(
-                        f"Checking bucket: {bucket_name['Name']} for Incomplete MPU Lifecycle rule"
-                    )
-                    get_incomplete_mpu_policy(bucket=bucket_name["Name"])
-                    logger.info("Action completed succesfully!\n")
-                    run = False
-                    sys.exit(0)
-                    break
+                summary = process_all_buckets(
+                    account,
+                    [bucket["Name"] for bucket in buckets],
+                    args.workers,
+                    checkpoint_path,
+                )
+                print_summary(summary)
+                logger.info("Action completed succesfully!\n")
+                sys.exit(1 if summary[FAILED] else 0)
 
             else:
                 os.system("clear")
@@ -216,7 +1053,10 @@ if __name__ == "__main__":
             ).lower()
             if modify_bucket == "y":
 
-                get_incomplete_mpu_policy(bucket=selected_bucket)
+                try:
+                    get_incomplete_mpu_policy(account, bucket=selected_bucket)
+                except ClientError as error:
+                    logger.error(f"Bucket {selected_bucket} failed: {error}")
                 print()
             else:
                 os.system("clear")
@@ -235,4 +1075,3 @@ if __name__ == "__main__":
                 logger.info(f"Exiting...Goodbye!")
                 sys.exit(0)
                 break
-
@@ -1,121 +1,184 @@
 """
 Get S3 buckets in an AWS account and apply a incomplete multi-part uploads (MPU) Lifecycle rule to cleanup orphaned incomplete MPUs after 7 days.
 Blog: https://aws.amazon.com/blogs/aws-cloud-financial-management/discovering-and-deleting-incomplete-multipart-uploads-to-lower-amazon-s3-costs/
+
+The CreateBucket events of EventBridge are buffered in an SQS queue and
+delivered in batches. Every bucket of a batch is checked once, with a single
+lifecycle PUT when its rules lack an incomplete MPU rule. The messages of the
+buckets that failed are returned as batch item failures, SQS redelivers only
+those.
 """
 
 import boto3
+import json
 import logging
+import os
+import threading
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Built once per container, reused by all the invocations it serves
+logger = logging.getLogger()
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+
+# Flag to run in dry run. No changes will be done to the buckets
+DRY_RUN = os.environ.get("DRY_RUN", "false").lower() == "true"
+
+# Incomplete MPU Lifecycle rule to create
+MPU_RULE = {
+    "ID": "delete-incomplete-mpu-7days",
+    "Status": "Enabled",
+    "Filter": {"Prefix": ""},
+    "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 7},
+}
+
+# Buckets of a batch checked at the same time
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "10"))
+
+# Throttled calls (SlowDown, 503) are retried with client side backoff
+client_config = Config(
+    retries={"mode": "adaptive", "max_attempts": 10},
+    max_pool_connections=MAX_WORKERS,
+)
+s3_client = boto3.client("s3", config=client_config)
+# One client per region, calls to a bucket go straight to the region it was created in
+regional_clients = {s3_client.meta.region_name: s3_client}
+clients_lock = threading.Lock()
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+
+def get_s3_client(region: str):
+    """Return the client of a region, creating it the first time.
+
+    Args:
+        region (str): The region of the bucket, None for the Lambda's region.
+
+    Returns:
+        S3.Client: A client of the region, shared by all the threads.
+    """
+    if region is None:
+        return s3_client
+    client = regional_clients.get(region)
+    if client is None:
+        with clients_lock:
+            client = regional_clients.get(region)
+            if client is None:
+                client = boto3.client("s3", region_name=region, config=client_config)
+                regional_clients[region] = client
+    return client
+
+
+def get_incomplete_mpu_policy(bucket: str, region: str = None) -> str:
+    """Given a bucket 'bucket' check if it has Lifecycle rules, in specific MPU Lifecycle rules.
+        If there aren't any Lifecycle rules create an MPU Lifecycle rule. If there are other
+        Lifecycle rules and none of them has an 'AbortIncompleteMultipartUpload' statement,
+        put them back together with the MPU rule, in a single call.
+
+    Args:
+        bucket (str): bucket name to check and/or create rule.
+        region (str, optional): The region of the bucket.
+
+    Raises:
+        ClientError: The lifecycle rules of the bucket could not be read or written.
+
+    Returns:
+        str: "compliant", "patched", or "would_patch" in dry run mode.
+    """
+    client = get_s3_client(region)
+
+    # Will return with ClientError if no rules configured on the bucket
+    try:
+        rules = client.get_bucket_lifecycle_configuration(Bucket=bucket)["Rules"]
+    except ClientError as error:
+        # Anything else (AccessDenied...) must not be taken for a bucket without rules
+        if error.response["Error"]["Code"] != "NoSuchLifecycleConfiguration":
+            raise
+        rules = []
+
+    for existing_rule in rules:
+        if existing_rule.get("AbortIncompleteMultipartUpload"):
+            logger.info(
+                f"The following Incomplete MPU rule already exists on {bucket}: {existing_rule.get('ID')}. Nothing to do."
+            )
+            return "compliant"
 
+    logger.info(f"No Incomplete MPU rule exists for this bucket: {bucket}...Adding one")
+    if DRY_RUN:
+        logger.info(f"Not changing bucket {bucket}. Running in DRY RUN Mode")
+        return "would_patch"
 
-s3_client = boto3.client("s3")
-logging.basicConfig(format='%(asctime)s: %(message)s', level=logging.DEBUG)
+    # The existing rules are kept, a lifecycle PUT replaces the whole configuration
+    client.put_bucket_lifecycle_configuration(
+        Bucket=bucket, LifecycleConfiguration={"Rules": rules + [MPU_RULE]}
+    )
+    logger.info(f"Incomplete MPU Lifecycle rule created for bucket {bucket}")
+    return "patched"
 
 
-def handler(event, context):
+def get_records(event: dict) -> list:
+    """Return the (message id, EventBridge event) pairs of an invocation.
 
-    # Flag to run in dry run. No changes will be done to the buckets
-    DRY_RUN = False
+    Args:
+        event (dict): A batch of SQS messages, or a single EventBridge event
+            when the function is invoked by the rule directly.
 
-    # Incomplete MPU Lifecycle rule to create
-    rule = {
-        "Rules": [
-            {
-                "ID": "delete-incomplete-mpu-7days",
-                "Status": "Enabled",
-                "Filter": {"Prefix": ""},
-                "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 7},
-            }
-        ]
-    }
+    Returns:
+        list: The message id is None for a direct EventBridge event.
+    """
+    if "Records" not in event:
+        return [(None, event)]
+    return [
+        (record["messageId"], json.loads(record["body"])) for record in event["Records"]
+    ]
 
-    def create_incomplete_mpu_policy(bucket: str) -> dict:
-        """Function that calls the S3 API and puts a lifecycle configuration on the bucket passed to it
-            and returns the lifecycle policy id to the caller
 
-        Args:
-            bucket (str): The name of the bucket to apply the configuration onto.
-
-        Returns:
-            response: Dictionary containing the information of the Lifecycle Rule created.
-        """
-
-        response = s3_client.put_bucket_lifecycle_configuration(
-            Bucket=bucket, LifecycleConfiguration=rule
+def handler(event, context):
+    # Several events of a batch can be about the same bucket (retries of
+    # CloudTrail, bucket deleted and created again), it is checked once
+    buckets = {}
+    failures = []
+    for message_id, bucket_event in get_records(event):
+        try:
+            detail = bucket_event["detail"]
+            bucket_name = detail["requestParameters"]["bucketName"]
+        except (KeyError, TypeError):
+            logger.error(f"Not a CreateBucket event, ignored: {bucket_event}")
+            continue
+
+        # Log that we received a creation event, so we can track it in CloudWatch Logs
+        logger.info(
+            {
+                "bucket_name": bucket_name,
+                "creation_time": detail.get("eventTime"),
+                "bucket_region": detail.get("awsRegion"),
+                "bucket_creator_arn": detail.get("userIdentity", {}).get("arn"),
+                "bucket_creator_name": detail.get("userIdentity", {}).get("userName"),
+            }
         )
-        return response
-
-    def get_incomplete_mpu_policy(bucket: str):
-        """Given a bucket 'bucket' check if it has Lifecycle rules, in specific MPU Lifecycle rules.
-            If there aren't any Lifecycle rules create an MPU Lifecycle rule. If there are other
-            Lifecycle rules, check first to ensure none of the rules is an MPU rule, by checking
-            if a rule with a statement 'AbortIncompleteMultipartUpload' exist.
-
-        Args:
-            bucket (str): bucket name to check and/or create rule.
-        """
+        region, message_ids = buckets.setdefault(
+            bucket_name, (detail.get("awsRegion"), [])
+        )
+        message_ids.append(message_id)
 
-        # Check if there are lifecycle rules created on the bucket. Will return with ClientError if no rules configured on the bucket
+    futures = {
+        bucket: executor.submit(get_incomplete_mpu_policy, bucket, region)
+        for bucket, (region, _) in buckets.items()
+    }
+    for bucket, future in futures.items():
         try:
-            bucket_lifecycle = s3_client.get_bucket_lifecycle_configuration(
-                Bucket=bucket
-            )
-        except ClientError:
-            # This means there are no lifecycle rules for the bucket. Create one
-            print(
-                f"No Incomplete MPU rule exist for this bucket: {bucket}...Adding one"
+            future.result()
+        except ClientError as error:
+            logger.error(f"Bucket {bucket} failed: {error}")
+            failures.extend(
+                message_id for message_id in buckets[bucket][1] if message_id
             )
+            if "Records" not in event:
+                # Direct invocation, let EventBridge retry it
+                raise
 
-            if not DRY_RUN:
-                response = create_incomplete_mpu_policy(bucket=bucket)
-
-                # If there's a response, the rule was created
-                if response is not None:
-                    print(f"Lifecycle created for bucket {bucket}: \n{response}")
-            else:
-                print("No changes done...Running in Dry run mode")
-
-        # If there are already Lifecycle rules create for the bucket, check if the rules contain an Incomplete MPU rule
-        else:
-            print(
-                f"Bucket {bucket} has already created Lifecycle Rules: \nChecking if there is an Incomplete MPU rule in place..."
-            )
-
-            # Go through all the lifecycle rules configured in the bucket
-            for rule in bucket_lifecycle["Rules"]:
-
-                if rule.get("AbortIncompleteMultipartUpload"):
-                    print(
-                        f"The following Incomplete MPU rule already exist: {rule['ID']}. Nothing to do."
-                    )
-                else:
-                    print(
-                        f"No Incomplete MPU rule exist for this bucket: {bucket}...Adding one"
-                    )
-
-                    if not DRY_RUN:
-                        response = create_incomplete_mpu_policy(bucket=bucket)
-                        print(
-                            f"Incomplete MPU Lifecycle rule created for bucket {bucket}: \n{response}"
-                        )
-                    else:
-                        print(f"Not changing bucket {bucket}. Running in DRY RUN Mode")
-
-    bucket_name = event["detail"]["requestParameters"].get("bucketName")
-    event_time = event["detail"]["eventTime"]
-    event_region = event["detail"]["awsRegion"]
-    user_arn = event["detail"]["userIdentity"]["arn"]
-    user_name = event["detail"]["userIdentity"]["userName"]
-
-    # Log that we received a creation event, so we can track it in CloudWatch Logs
-
-    logging.info(
-        {
-        "bucket_name": bucket_name,
-        "creation_time": event_time,
-        "bucket_region": event_region,
-        "bucket_creator_arn": user_arn,
-        "bucket_creator_name": user_name
-    })
-
-    get_incomplete_mpu_policy(bucket=bucket_name)
+    # Partial batch response, only the messages of the failed buckets are retried
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]
+    }
@@ -7,6 +7,8 @@ from aws_cdk import (
     aws_sns as sns,
     aws_iam as iam,
     aws_lambda as _lambda,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_sqs as sqs,
     Duration,
 )
 from constructs import Construct
@@ -36,6 +38,8 @@ class S3MpuCdkStack(Stack):
                 ),
             ),
             handler="s3-incomplete-mpu.handler",
+            timeout=Duration.seconds(60),
+            environment={"DRY_RUN": "false", "MAX_WORKERS": "10"},
         )
 
         # Allow Lambda to apply the lifecycle configuration to S3 buckets
@@ -43,14 +47,46 @@ class S3MpuCdkStack(Stack):
         s3_incomplete_mpu_lambda.role.add_to_principal_policy(
             iam.PolicyStatement(
                 effect=iam.Effect.ALLOW,
-                actions=["s3:PutLifecycleConfiguration"],
+                actions=[
+                    "s3:GetLifecycleConfiguration",
+                    "s3:PutLifecycleConfiguration",
+                ],
                 resources=["*"],
             )
         )
 
+        # Buffer the CreateBucket events, so that a burst of new buckets is handled
+        # by a few invocations with a batch each instead of one invocation per bucket.
+        # Messages failing 3 times are kept in the dead letter queue
+
+        create_bucket_dlq = sqs.Queue(
+            self,
+            "S3CreateBucketDLQ",
+            retention_period=Duration.days(14),
+        )
+
+        create_bucket_queue = sqs.Queue(
+            self,
+            "S3CreateBucketQueue",
+            # Lambda recommends 6 times the function timeout
+            visibility_timeout=Duration.seconds(360),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=3, queue=create_bucket_dlq
+            ),
+        )
+
+        s3_incomplete_mpu_lambda.add_event_source(
+            lambda_event_sources.SqsEventSource(
+                create_bucket_queue,
+                batch_size=100,
+                max_batching_window=Duration.seconds(30),
+                report_batch_item_failures=True,
+            )
+        )
+
         # Create a new EventBridge rule to monitor CloudTrail for a specific S3 CreateBucket API call
 
-        create_bucket_rule = eb.Rule(
+        eb.Rule(
             self,
             "CloudTrailS3CreateBucket",
             description="Rule to trigger when CloudTrail detects an S3 CreateBucket API call.",
@@ -67,19 +103,10 @@ class S3MpuCdkStack(Stack):
                 },
             ),
             targets=[
-                eb_targets.LambdaFunction(
-                    s3_incomplete_mpu_lambda,
+                eb_targets.SqsQueue(
+                    create_bucket_queue,
                     max_event_age=Duration.hours(2),
                     retry_attempts=2,
                 )
             ],
         )
-
-        # Allow Lambda to be invoked by EventBridge rule
-
-        s3_incomplete_mpu_lambda.grant_invoke(
-            iam.ServicePrincipal(
-                service="events.amazonaws.com",
-                conditions={"ArnLike": {"AWS:SourceArn": create_bucket_rule.rule_arn}},
-            )
-        )
@@ -0,0 +1,134 @@
+import importlib.util
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+HANDLER_PATH = Path(__file__).parents[2] / "lambda" / "s3-incomplete-mpu.py"
+EXISTING_RULE = {
+    "ID": "expire-logs",
+    "Status": "Enabled",
+    "Filter": {"Prefix": "logs/"},
+    "Expiration": {"Days": 30},
+}
+
+
+@pytest.fixture()
+def lambda_handler(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("DRY_RUN", raising=False)
+    spec = importlib.util.spec_from_file_location("s3_incomplete_mpu", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # One bucket at a time, the stubbed responses are consumed in order
+    monkeypatch.setattr(module, "executor", ThreadPoolExecutor(max_workers=1))
+    with Stubber(module.s3_client) as stubber:
+        yield module, stubber
+        stubber.assert_no_pending_responses()
+
+
+def create_bucket_event(bucket):
+    return {
+        "detail": {
+            "eventTime": "2024-05-06T10:00:00Z",
+            "awsRegion": "us-east-1",
+            "requestParameters": {"bucketName": bucket},
+            "userIdentity": {"arn": "arn:aws:iam::123456789012:user/dev"},
+        }
+    }
+
+
+def sqs_batch(*buckets):
+    return {
+        "Records": [
+            {
+                "messageId": f"message-{index}",
+                "body": json.dumps(create_bucket_event(bucket)),
+            }
+            for index, bucket in enumerate(buckets)
+        ]
+    }
+
+
+def test_duplicate_events_checked_once(lambda_handler):
+    module, stubber = lambda_handler
+    stubber.add_response(
+        "get_bucket_lifecycle_configuration",
+        {"Rules": [module.MPU_RULE]},
+        {"Bucket": "bucket-a"},
+    )
+
+    response = module.handler(sqs_batch("bucket-a", "bucket-a"), None)
+
+    assert response == {"batchItemFailures": []}
+
+
+def test_rule_added_next_to_existing_rules(lambda_handler):
+    module, stubber = lambda_handler
+    stubber.add_response(
+        "get_bucket_lifecycle_configuration",
+        {"Rules": [EXISTING_RULE]},
+        {"Bucket": "bucket-a"},
+    )
+    stubber.add_response(
+        "put_bucket_lifecycle_configuration",
+        {},
+        {
+            "Bucket": "bucket-a",
+            "LifecycleConfiguration": {"Rules": [EXISTING_RULE, module.MPU_RULE]},
+        },
+    )
+
+    response = module.handler(sqs_batch("bucket-a"), None)
+
+    assert response == {"batchItemFailures": []}
+
+
+def test_access_denied_fails_messages_of_bucket(lambda_handler):
+    module, stubber = lambda_handler
+    stubber.add_client_error(
+        "get_bucket_lifecycle_configuration",
+        "AccessDenied",
+        expected_params={"Bucket": "bucket-denied"},
+    )
+    stubber.add_client_error(
+        "get_bucket_lifecycle_configuration",
+        "NoSuchLifecycleConfiguration",
+        expected_params={"Bucket": "bucket-ok"},
+    )
+    stubber.add_response(
+        "put_bucket_lifecycle_configuration",
+        {},
+        {
+            "Bucket": "bucket-ok",
+            "LifecycleConfiguration": {"Rules": [module.MPU_RULE]},
+        },
+    )
+
+    response = module.handler(
+        sqs_batch("bucket-denied", "bucket-ok", "bucket-denied"), None
+    )
+
+    assert response == {
+        "batchItemFailures": [
+            {"itemIdentifier": "message-0"},
+            {"itemIdentifier": "message-2"},
+        ]
+    }
+
+
+def test_direct_eventbridge_error_raised(lambda_handler):
+    module, stubber = lambda_handler
+    stubber.add_client_error(
+        "get_bucket_lifecycle_configuration",
+        "AccessDenied",
+        expected_params={"Bucket": "bucket-denied"},
+    )
+
+    with pytest.raises(ClientError):
+        module.handler(create_bucket_event("bucket-denied"), None)
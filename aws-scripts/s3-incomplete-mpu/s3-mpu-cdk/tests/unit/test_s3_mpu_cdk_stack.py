@@ -1,16 +1,20 @@
 import aws_cdk as core
 import aws_cdk.assertions as assertions
 
-from s3_mpu_cdk.s3_mpu_cdk_stack import S3MpuCdkStack
+from stacks.s3_mpu_cdk_stack import S3MpuCdkStack
+
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in s3_mpu_cdk/s3_mpu_cdk_stack.py
 def test_sqs_queue_created():
     app = core.App()
     stack = S3MpuCdkStack(app, "s3-mpu-cdk")
     template = assertions.Template.from_stack(stack)
 
-
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+    template.has_resource_properties("AWS::SQS::Queue", {"VisibilityTimeout": 360})
+    template.has_resource_properties(
+        "AWS::Lambda::EventSourceMapping",
+        {
+            "BatchSize": 100,
+            "MaximumBatchingWindowInSeconds": 30,
+            "FunctionResponseTypes": ["ReportBatchItemFailures"],
+        },
+    )
@@ -1,23 +1,57 @@
+import logging
+
 from flask import Flask
-from flask_bootstrap import Bootstrap
-from flask_ckeditor import CKEditor
 from flask_gravatar import Gravatar
 from flask_login import LoginManager
-from flask_migrate import Config
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 
-# Create a CKEditor Object
-ckeditor = CKEditor()
+from .cache import PageCache
+from .counters import PostCounters
+from .images import ImageProxy
+from .metrics import RequestMetrics
+from .passwords import LoginThrottle
+from .passwords import PasswordHasher
+from .pool import PoolMetrics
+from .routing import ReplicaRouter
+from .routing import RoutingSession
+from .search import SearchIndex
+from .sessions import SessionStore
+from .startup import StartupProfile
 
 # Create SQLAlchemy object
-db = SQLAlchemy()
+# The routing session sends the reads of read only views to the reader bind
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Keeps clients that just wrote on the writer
+replica_router = ReplicaRouter()
 
 # Create a Flask login manager
 login_manager = LoginManager()
 
-# Initialize a Migrate object
-migrate = Migrate()
+# Server-side sessions, when SESSION_BACKEND is redis or db
+session_store = SessionStore()
+
+# Password hashing on a bounded thread pool, and failed login throttling
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
+
+# Buffered post view and like counters
+post_counters = PostCounters()
+
+# Connection pool metrics
+pool_metrics = PoolMetrics()
+
+# Request latency, SQL and template metrics on /metrics
+request_metrics = RequestMetrics()
+
+# Rendered page cache for anonymous readers
+page_cache = PageCache()
+
+# Full-text search over the posts
+search_index = SearchIndex()
+
+# Resized and cached post header images
+image_proxy = ImageProxy()
 
 # Create a Grvatar object
 gravatar = Gravatar(
@@ -32,24 +66,76 @@ gravatar = Gravatar(
 
 
 def init_app(config):
-    """Initialize Core Applications."""
+    """Initialize Core Applications.
+
+    With APP_MODE set to "reader" only the public pages and login are served,
+    CKEditor and the admin views are neither imported nor set up. The schema
+    commands are registered in both modes, boot.sh runs them before gunicorn.
+    """
+    profile = StartupProfile()
     app = Flask(__name__, instance_relative_config=False)
     # Grab the configuration from config.py depending on environment
     app.config.from_object(config)
-    login_manager.init_app(app)
-    Bootstrap(app)
-    db.init_app(app)
-    ckeditor.init_app(app)
-    # Create a Gravatar Object
-    # Doc: https://pythonhosted.org/Flask-Gravatar/
-    gravatar.init_app(app)
-    migrate.init_app(app, db)
+    app.extensions["startup_profile"] = profile
+    reader_mode = app.config.get("APP_MODE", "full") == "reader"
+
+    with profile.step("login_manager"):
+        login_manager.init_app(app)
+        password_hasher.init_app(app)
+        login_throttle.init_app(app)
+    with profile.step("bootstrap"):
+        from flask_bootstrap import Bootstrap
+
+        Bootstrap(app)
+    with profile.step("sqlalchemy"):
+        # Has to run before db.init_app, it sets the pool class of the engines
+        pool_metrics.init_app(app, db)
+        db.init_app(app)
+        replica_router.init_app(app)
+    with profile.step("session_store"):
+        session_store.init_app(app, db)
+    if not reader_mode:
+        with profile.step("ckeditor"):
+            from flask_ckeditor import CKEditor
+
+            CKEditor(app)
+    with profile.step("gravatar"):
+        # Doc: https://pythonhosted.org/Flask-Gravatar/
+        gravatar.init_app(app)
+    with profile.step("migrate"):
+        from flask_migrate import Migrate
+
+        from .schema import schema_cli
+
+        Migrate(app, db)
+        # flask schema upgrade / wait, used by the migration job and boot.sh
+        app.cli.add_command(schema_cli)
+    with profile.step("post_counters"):
+        post_counters.init_app(app, db)
+    with profile.step("page_cache"):
+        page_cache.init_app(app)
+    with profile.step("search_index"):
+        search_index.init_app(app, db)
+    with profile.step("static_assets"):
+        # Hashed and precompressed static files, when they were built
+        from .assets import StaticAssets
+
+        StaticAssets(app)
+    with profile.step("image_proxy"):
+        image_proxy.init_app(app)
+    with profile.step("request_metrics"):
+        request_metrics.init_app(app, db)
 
     with app.app_context():
-        from . import routes
-        from . import models
-        from . import forms
+        with profile.step("models"):
+            from . import models
+        with profile.step("views"):
+            from .views import register_views
+
+            register_views(app, "reader" if reader_mode else "full")
 
         # db.create_all()
 
-        return app
+    if app.config.get("STARTUP_PROFILE", False):
+        profile.log(logging.getLogger(__name__))
+    return app
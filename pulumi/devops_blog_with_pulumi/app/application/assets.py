@@ -0,0 +1,206 @@
+"""Fingerprinted and precompressed static assets.
+
+``python -m application.assets`` runs at image build time (see Dockerfile).
+It copies every file of ``application/static`` to ``static/dist``, adding
+the hash of the file contents to its name. It also writes gzip and, when
+the brotli package is installed, brotli variants next to the compressible
+files, and a ``manifest.json`` mapping the original names to the hashed ones.
+The CSS references (fonts, images) are rewritten to the hashed names as well.
+
+At runtime StaticAssets reads the manifest, so ``url_for("static", ...)``
+returns the hashed names. The hashed files are served with an immutable
+``Cache-Control``, in the best precompressed variant the client accepts, so
+the ALB/CDN and browsers keep them forever and a deploy changes their names.
+Without a manifest (development) nothing changes.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+
+from flask import request
+from flask import send_from_directory
+
+# Directory of the static folder the build writes to
+OUTPUT_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Sources only, not served
+SKIP_DIRS = ("scss",)
+
+# Precompressed variants, by order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = (".css", ".js", ".map", ".svg", ".json", ".txt", ".ttf", ".eot")
+# Smaller files are not worth a precompressed variant
+MIN_COMPRESS_SIZE = 1024
+
+# One year, the longest lifetime caches honour
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def hashed_name(name: str, content: bytes) -> str:
+    """Add the first 12 hex digits of the SHA-256 of the contents to a file name.
+
+    Args:
+        name (str): File name, e.g. css/clean-blog.min.css.
+        content (bytes): Contents of the file.
+
+    Returns:
+        str: The hashed name, e.g. css/clean-blog.min.3f2a9c1b0d4e.css.
+    """
+    root, ext = posixpath.splitext(name)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _rewrite_css_urls(name: str, content: bytes, manifest: dict) -> bytes:
+    # Point the url() of a stylesheet to the hashed files, the relative
+    # references keep working as every file moves under the same directory
+    directory = posixpath.dirname(name)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(("data:", "http:", "https:", "//", "#", "/")):
+            return match.group(0)
+        path, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+        target = posixpath.normpath(posixpath.join(directory, path))
+        if target not in manifest:
+            return match.group(0)
+        relative = posixpath.relpath(
+            manifest[target], posixpath.join(OUTPUT_DIR, directory)
+        )
+        return f"url({quote}{relative}{suffix}{quote})"
+
+    text = content.decode("utf-8")
+    return _CSS_URL_RE.sub(replace, text).encode("utf-8")
+
+
+def _compress(path: str, content: bytes) -> None:
+    try:
+        import brotli
+    except ImportError:  # gzip only
+        brotli = None
+
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content)))
+    for suffix, compressed in variants:
+        # Keep a variant only if it saves something
+        if len(compressed) < len(content):
+            with open(path + suffix, "wb") as file:
+                file.write(compressed)
+
+
+def build(static_folder: str) -> dict:
+    """Write the hashed and precompressed copies of the static files.
+
+    Args:
+        static_folder (str): Path of the static folder of the app.
+
+    Returns:
+        dict: The manifest, original name to hashed name.
+    """
+    output = os.path.join(static_folder, OUTPUT_DIR)
+    shutil.rmtree(output, ignore_errors=True)
+
+    names = []
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [
+            d
+            for d in dirs
+            if os.path.relpath(os.path.join(root, d), static_folder)
+            not in SKIP_DIRS + (OUTPUT_DIR,)
+        ]
+        for file in files:
+            relative = os.path.relpath(os.path.join(root, file), static_folder)
+            names.append(relative.replace(os.sep, "/"))
+    # Stylesheets last, their references have to be hashed first
+    names.sort(key=lambda name: (name.endswith(".css"), name))
+
+    manifest = {}
+    for name in names:
+        with open(os.path.join(static_folder, name), "rb") as file:
+            content = file.read()
+        if name.endswith(".css"):
+            content = _rewrite_css_urls(name, content, manifest)
+        manifest[name] = posixpath.join(OUTPUT_DIR, hashed_name(name, content))
+
+        path = os.path.join(static_folder, manifest[name])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(content)
+        if name.endswith(COMPRESSIBLE) and len(content) >= MIN_COMPRESS_SIZE:
+            _compress(path, content)
+
+    with open(os.path.join(output, MANIFEST_NAME), "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """Serve the static files built by ``build`` under their hashed names."""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self._hashed = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["static_assets"] = self
+        if not app.config.get("STATIC_ASSETS_ENABLED", True) or not app.static_folder:
+            return
+        path = os.path.join(app.static_folder, OUTPUT_DIR, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return
+        with open(path) as file:
+            self.manifest = json.load(file)
+        self._hashed = set(self.manifest.values())
+
+        app.url_defaults(self._hashed_url)
+        send_static_file = app.view_functions["static"]
+
+        def static(filename):
+            if filename not in self._hashed:
+                return send_static_file(filename=filename)
+            return self._send_hashed(app.static_folder, filename)
+
+        app.view_functions["static"] = static
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == "static" and values.get("filename") in self.manifest:
+            values["filename"] = self.manifest[values["filename"]]
+
+    @staticmethod
+    def _send_hashed(static_folder, filename):
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        encoding, suffix = None, ""
+        for name, extension in ENCODINGS:
+            if name in request.accept_encodings and os.path.exists(
+                os.path.join(static_folder, filename + extension)
+            ):
+                encoding, suffix = name, extension
+                break
+
+        response = send_from_directory(
+            static_folder, filename + suffix, mimetype=mimetype, conditional=True
+        )
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+if __name__ == "__main__":
+    folder = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    )
+    print(f"Built {len(build(folder))} static files in {folder}/{OUTPUT_DIR}")
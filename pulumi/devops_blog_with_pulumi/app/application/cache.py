@@ -0,0 +1,182 @@
+"""Rendered page cache for anonymous readers.
+
+Pages are cached per route (and per post slug for post pages) and dropped by
+the routes right after the commits that change them. Backends are selected
+with ``PAGE_CACHE_TYPE``:
+
+* ``lru``: in-process LRU, the default. Every gunicorn worker keeps its own
+  copy, so invalidations only reach other workers once ``PAGE_CACHE_TTL``
+  expires.
+* ``redis``: any Redis-compatible server (``PAGE_CACHE_REDIS_URL``), shared by
+  all workers and pods. Needs the ``redis`` package installed.
+* ``null``: caching disabled.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+
+class NullBackend:
+    """Backend that never stores anything."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUBackend:
+    """Thread safe in-process LRU with per entry expiration."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Backend storing JSON encoded entries in a Redis-compatible server.
+
+    Connection errors are logged and treated as cache misses, the page is
+    then rendered from the DB as if there was no cache.
+    """
+
+    def __init__(self, url: str, prefix: str = "blog:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except self._errors:
+            logger.exception("Page cache read failed")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        try:
+            self._client.set(self.prefix + key, json.dumps(value), ex=ttl)
+        except self._errors:
+            logger.exception("Page cache write failed")
+
+    def delete(self, *keys):
+        try:
+            self._client.delete(*(self.prefix + key for key in keys))
+        except self._errors:
+            logger.exception("Page cache invalidation failed")
+
+    def delete_prefix(self, prefix):
+        try:
+            keys = list(self._client.scan_iter(f"{self.prefix}{prefix}*"))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors:
+            logger.exception("Page cache invalidation failed")
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{self.prefix}*"):
+            self._client.delete(key)
+
+
+class PageCache:
+    """Cache of rendered pages, keyed per route and per post slug."""
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.ttl = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get("PAGE_CACHE_TYPE", "lru")
+        self.ttl = app.config.get("PAGE_CACHE_TTL", 60)
+        if cache_type == "redis":
+            self.backend = RedisBackend(app.config["PAGE_CACHE_REDIS_URL"])
+        elif cache_type == "lru":
+            self.backend = LRUBackend(app.config.get("PAGE_CACHE_MAX_ENTRIES", 512))
+        elif cache_type == "null":
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown PAGE_CACHE_TYPE: {cache_type}")
+        app.extensions["page_cache"] = self
+
+    @staticmethod
+    def index_key(before: int = None, after: int = None) -> str:
+        """Every page of the post listing is cached under its own cursor."""
+        return f"page:index:{before or ''}:{after or ''}"
+
+    @staticmethod
+    def post_key(post_name: str) -> str:
+        return f"page:post:{post_name}"
+
+    @staticmethod
+    def cacheable() -> bool:
+        """Only GET requests from anonymous readers get the same page."""
+        return request.method == "GET" and not current_user.is_authenticated
+
+    def get(self, key: str):
+        return self.backend.get(key)
+
+    def set(self, key: str, value: dict) -> None:
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, *post_names: str, index: bool = True) -> None:
+        """Drop the pages of the given posts and, unless told not to, every
+        page of the index."""
+        if post_names:
+            self.backend.delete(*(self.post_key(name) for name in post_names))
+        if index:
+            self.backend.delete_prefix("page:index:")
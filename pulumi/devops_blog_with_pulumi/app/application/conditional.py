@@ -0,0 +1,103 @@
+"""HTTP conditional requests (ETag) for the pages.
+
+The views compute the version of a page from a small query (the post
+``updated_at`` and the number of its comments, the newest post of the
+listing...) before loading and rendering it. A client sending back a
+matching ``If-None-Match`` gets a 304 without the page being rendered.
+
+No Last-Modified is sent: deleting a post or a comment, or deploying new
+templates, changes the ETag but no date, an ``If-Modified-Since`` would
+get a stale 304.
+
+The ETag also covers the user the page was rendered for and the templates
+and static manifest of the deployed image, so a deploy changes every ETag.
+The view and like counts shown on the pages are not part of it, returning
+visitors see them as of their last full response.
+"""
+import hashlib
+import os
+from functools import lru_cache
+from typing import NamedTuple
+from typing import Optional
+
+from flask import current_app
+from flask import make_response
+from flask import request
+from flask import Response
+
+from .assets import MANIFEST_NAME
+from .assets import OUTPUT_DIR
+
+
+@lru_cache(maxsize=None)
+def _release(template_folder: str, static_folder: str) -> str:
+    # Hash of what the pages are rendered with, the same on every worker
+    # running the same image
+    digest = hashlib.sha256()
+    paths = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(template_folder)
+        for name in names
+    ]
+    paths.append(os.path.join(static_folder, OUTPUT_DIR, MANIFEST_NAME))
+    for path in sorted(paths):
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+class PageVersion(NamedTuple):
+    """Validators of a page, see ``page_version``."""
+
+    etag: str
+    # Rendered for a logged in user, shared caches must not keep it
+    private: bool
+
+    def not_modified(self) -> Optional[Response]:
+        """Return a 304 response if the client has this version of the page."""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if not request.if_none_match.contains_weak(self.etag):
+            return None
+        return self.apply(Response(status=304))
+
+    def apply(self, body) -> Response:
+        """Make a response of a view result carrying the validators."""
+        response = make_response(body)
+        response.set_etag(self.etag, weak=True)
+        # Revalidate on every use, a 304 is cheap
+        response.cache_control.no_cache = True
+        if self.private:
+            response.cache_control.private = True
+        return response
+
+    def as_dict(self) -> dict:
+        """JSON friendly copy, for the page cache."""
+        return {"etag": self.etag, "private": self.private}
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "PageVersion":
+        return cls(etag=values["etag"], private=values["private"])
+
+
+def page_version(*parts, user_id: str = None) -> PageVersion:
+    """Build the validators of a page.
+
+    Args:
+        *parts: Whatever identifies the content of the page, e.g. the post id,
+            its updated_at and its number of comments.
+        user_id (str, optional): Id of the logged in user the page is for.
+
+    Returns:
+        PageVersion: The ETag of the page.
+    """
+    release = _release(
+        os.path.join(current_app.root_path, current_app.template_folder),
+        current_app.static_folder,
+    )
+    key = "|".join(str(part) for part in (release, user_id, *parts))
+    return PageVersion(
+        etag=hashlib.sha256(key.encode("utf-8")).hexdigest()[:32],
+        private=user_id is not None,
+    )
@@ -0,0 +1,135 @@
+"""Buffered post view and like counters.
+
+Increments are kept in process memory and written back periodically with one
+``UPDATE blog_posts SET post_views = post_views + n`` statement per post, so a
+page view no longer opens (and locks a row in) a write transaction of its own.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+from collections import defaultdict
+
+from sqlalchemy import func
+from sqlalchemy import update
+
+# Columns of BlogPost that can be incremented through the counters
+COUNTER_FIELDS = ("post_views", "post_likes")
+
+logger = logging.getLogger(__name__)
+
+
+class PostCounters:
+    """In-process buffer of post counter increments.
+
+    Configured through ``POST_COUNTER_FLUSH_INTERVAL`` (seconds). A value of 0
+    disables the background flusher, counts are then only written on
+    ``flush()`` or when the worker shuts down.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(Counter)
+        self._stop = threading.Event()
+        self._thread = None
+        self._app = None
+        self._db = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self._app = app
+        self._db = db
+        app.extensions["post_counters"] = self
+        # Templates read the counters through post_count(post, "post_views")
+        app.add_template_global(self.get, "post_count")
+        # Gunicorn workers exit through sys.exit on graceful shutdown,
+        # so whatever is still buffered gets written back here
+        atexit.register(self.shutdown)
+
+        flush_interval = app.config.get("POST_COUNTER_FLUSH_INTERVAL", 5)
+        if flush_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(flush_interval,),
+                name="post-counters-flush",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def incr(self, post_id: int, field: str, amount: int = 1) -> None:
+        """Buffer an increment of the given counter of a post.
+
+        Args:
+            post_id (int): Id of the post to be updated.
+            field (str): One of COUNTER_FIELDS.
+            amount (int, optional): Value to add. Defaults to 1.
+        """
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"Unknown post counter: {field}")
+        with self._lock:
+            self._pending[post_id][field] += amount
+
+    def get(self, post, field: str) -> int:
+        """Return the persisted value of a post counter plus the pending increments.
+
+        Args:
+            post: A BlogPost, or any row exposing ``id`` and the counter column.
+            field (str): One of COUNTER_FIELDS.
+
+        Returns:
+            int: The current value of the counter.
+        """
+        with self._lock:
+            pending = self._pending.get(post.id, {}).get(field, 0)
+        return (getattr(post, field) or 0) + pending
+
+    def flush(self) -> int:
+        """Write the buffered increments back to the DB.
+
+        Returns:
+            int: The number of posts updated.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+        if not pending:
+            return 0
+
+        from .models import BlogPost
+
+        try:
+            with self._app.app_context():
+                with self._db.engine.begin() as connection:
+                    for post_id, counts in pending.items():
+                        values = {
+                            getattr(BlogPost, field): func.coalesce(
+                                getattr(BlogPost, field), 0
+                            )
+                            + amount
+                            for field, amount in counts.items()
+                        }
+                        # Views and likes are not changes of the post,
+                        # keep the ETag of its pages
+                        values[BlogPost.updated_at] = BlogPost.updated_at
+                        connection.execute(
+                            update(BlogPost)
+                            .where(BlogPost.id == post_id)
+                            .values(values)
+                        )
+        except Exception:
+            logger.exception("Could not flush post counters, retrying on next run")
+            # Put the counts back so they are not lost
+            with self._lock:
+                for post_id, counts in pending.items():
+                    self._pending[post_id].update(counts)
+            return 0
+        return len(pending)
+
+    def shutdown(self) -> None:
+        """Stop the background flusher and write back whatever is pending."""
+        self._stop.set()
+        self.flush()
+
+    def _run(self, flush_interval: float) -> None:
+        while not self._stop.wait(flush_interval):
+            self.flush()
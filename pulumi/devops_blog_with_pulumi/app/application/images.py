@@ -0,0 +1,254 @@
+"""Resized copies of the post header images, served by the app.
+
+The posts point to images of other hosts (``BlogPost.img_url``), often photos
+of several MB. ``/img/<post_id>/<width>`` fetches the image of a post once,
+resizes it to every width of ``IMAGE_WIDTHS`` and keeps the JPEGs in a disk
+cache (``IMAGE_CACHE_DIR``). The fetch and the resizing run on a background
+thread (``IMAGE_RESIZE_WORKERS``), the request that missed the cache is
+redirected to the original image right away. When the cache grows over
+``IMAGE_CACHE_MAX_BYTES``, the least recently served files are removed.
+
+The post page links the widest copy and, through media queries, the narrower
+ones on small screens. The links built by ``post_image_url`` carry a hash of the image URL, so they
+are served with an immutable ``Cache-Control`` and change when the post gets
+another image. Resizing needs Pillow. Without it, or when the image cannot be
+fetched, the route redirects to the original image.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict
+from typing import Optional
+from typing import Set
+
+import requests
+from flask import url_for
+
+logger = logging.getLogger(__name__)
+
+# Widths the images are resized to, in pixels
+DEFAULT_WIDTHS = (480, 960, 1600)
+# Seconds before an image that could not be fetched or resized is tried again
+RETRY_AFTER = 300
+
+
+def image_version(img_url: str) -> str:
+    """Short hash of an image URL, part of the cache keys and of the links."""
+    return hashlib.sha256(img_url.encode("utf-8")).hexdigest()[:16]
+
+
+class DiskLRU:
+    """Files in a directory, the least recently used removed over a size.
+
+    The modification time of a file is its last use, so the cache survives
+    restarts and is shared by the workers of a pod.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the path of a cached file, marking it as used."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, content: bytes) -> str:
+        """Store a file, then evict the oldest ones if the cache is too big."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Written aside and renamed, readers never see a partial file
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(content)
+        os.replace(temporary, self.path(key))
+        self.evict()
+        return self.path(key)
+
+    def evict(self) -> None:
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def resize(content: bytes, width: int, quality: int = 82) -> bytes:
+    """Scale an image down to a width and encode it as a progressive JPEG.
+
+    Args:
+        content (bytes): The original image, in any format Pillow reads.
+        width (int): Width of the result, images already narrower are kept.
+        quality (int, optional): JPEG quality. Defaults to 82.
+
+    Returns:
+        bytes: The JPEG.
+    """
+    from PIL import Image
+    from PIL import ImageOps
+
+    with Image.open(BytesIO(content)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        output = BytesIO()
+        image.save(output, "JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+class ImageProxy:
+    """Fetch, resize and cache the header images of the posts."""
+
+    def __init__(self, app=None):
+        self.widths = DEFAULT_WIDTHS
+        self.cache = None
+        self.fetch_timeout = 5.0
+        self.max_source_bytes = 20 * 1024 * 1024
+        self.quality = 82
+        self.enabled = False
+        self._workers = 1
+        self._executor = None
+        self._lock = threading.Lock()
+        # Images being made in the background, queued only once
+        self._pending: Set[str] = set()
+        # Images that could not be made, not tried again before the given time
+        self._failed: Dict[str, float] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["image_proxy"] = self
+        self.widths = tuple(app.config.get("IMAGE_WIDTHS", DEFAULT_WIDTHS))
+        self.cache = DiskLRU(
+            app.config.get(
+                "IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "blog-images")
+            ),
+            app.config.get("IMAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+        )
+        self.fetch_timeout = app.config.get("IMAGE_FETCH_TIMEOUT", 5.0)
+        self.max_source_bytes = app.config.get(
+            "IMAGE_MAX_SOURCE_BYTES", self.max_source_bytes
+        )
+        self.quality = app.config.get("IMAGE_QUALITY", 82)
+        self._workers = app.config.get("IMAGE_RESIZE_WORKERS", 1)
+        self.enabled = importlib.util.find_spec("PIL") is not None
+        if not self.enabled:
+            logger.warning("Pillow is not installed, images are not resized")
+        app.add_template_global(self.url, "post_image_url")
+        app.add_template_global(self.widths, "post_image_widths")
+
+    def url(self, post, width: int = None) -> str:
+        """Link to a resized header image of a post, the largest by default."""
+        return url_for(
+            "blog.post_image",
+            post_id=post.id,
+            width=width or self.widths[-1],
+            v=image_version(post.img_url),
+        )
+
+    @staticmethod
+    def key(img_url: str, width: int) -> str:
+        return f"{image_version(img_url)}-{width}.jpg"
+
+    def thumbnail(self, img_url: str, width: int) -> Optional[str]:
+        """Return the path of an image resized to a width, if it is cached.
+
+        On a miss the image is made in the background, the request does not
+        wait for it.
+
+        Args:
+            img_url (str): URL of the original image.
+            width (int): One of the configured widths.
+
+        Returns:
+            Optional[str]: Path of the JPEG, None if it is not made (yet).
+        """
+        path = self.cache.get(self.key(img_url, width))
+        if path is not None or not self.enabled:
+            return path
+
+        version = image_version(img_url)
+        with self._lock:
+            if (
+                version in self._pending
+                or self._failed.get(version, 0) > time.monotonic()
+            ):
+                return None
+            self._pending.add(version)
+        try:
+            self._submit(self._make, img_url)
+        except Exception:
+            with self._lock:
+                self._pending.discard(version)
+            raise
+        return None
+
+    def _submit(self, function, *args):
+        gevent_monkey = sys.modules.get("gevent.monkey")
+        if gevent_monkey is not None and gevent_monkey.is_module_patched("threading"):
+            # The threads of the executor would be greenlets, resize on the
+            # native threads of the hub instead
+            import gevent
+
+            return gevent.get_hub().threadpool.spawn(function, *args)
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Created on first use, after gunicorn forked the worker
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._workers, thread_name_prefix="image-resize"
+                    )
+        return self._executor.submit(function, *args)
+
+    def _make(self, img_url):
+        version = image_version(img_url)
+        try:
+            content = self._fetch(img_url)
+            # Every width at once, the original is only fetched once
+            for size in self.widths:
+                self.cache.put(
+                    self.key(img_url, size), resize(content, size, self.quality)
+                )
+        except Exception:
+            logger.exception("Could not resize %s", img_url)
+            with self._lock:
+                self._failed[version] = time.monotonic() + RETRY_AFTER
+        finally:
+            with self._lock:
+                self._pending.discard(version)
+
+    def _fetch(self, img_url):
+        if not img_url.startswith(("http://", "https://")):
+            raise ValueError(f"Not an HTTP image URL: {img_url}")
+        with requests.get(img_url, timeout=self.fetch_timeout, stream=True) as reply:
+            reply.raise_for_status()
+            content = BytesIO()
+            for chunk in reply.iter_content(64 * 1024):
+                content.write(chunk)
+                if content.tell() > self.max_source_bytes:
+                    raise ValueError(f"Image larger than allowed: {img_url}")
+        return content.getvalue()
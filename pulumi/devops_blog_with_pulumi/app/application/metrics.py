@@ -0,0 +1,343 @@
+"""Request metrics in the Prometheus text format.
+
+When ``METRICS_ENABLED`` is set, the WSGI app is wrapped by a middleware
+timing every request, and the SQLAlchemy engines and the template rendering
+are timed for the request running them. Per endpoint, ``/metrics`` serves:
+
+* ``flask_request_duration_seconds``: histogram by endpoint, method and status.
+* ``flask_sql_queries_total`` / ``flask_sql_seconds_total``: statements sent
+  to the database and the time spent on them.
+* ``flask_template_render_seconds_total``: time spent rendering templates.
+
+Requests slower than ``METRICS_SLOW_REQUEST_SECONDS`` are logged with their
+statements, the quickest way to find the route behind an Aurora CPU spike.
+
+Every gunicorn worker keeps its own numbers. With ``METRICS_MULTIPROC_DIR``
+set (gunicorn.conf.py does it), each worker writes them to a file of that
+directory at most every ``DUMP_SECONDS`` and when it exits, and ``/metrics``
+sums the files of all the workers, past ones included, so the counters of a
+pod only go up whichever worker takes the scrape.
+No prometheus_client dependency, the format is written here.
+"""
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import before_render_template
+from flask import request
+from flask import Response
+from flask import template_rendered
+from sqlalchemy import event
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Key of the WSGI environ holding the endpoint of the request
+ENDPOINT_KEY = "blog.endpoint"
+# Statements kept per request for the slow request log
+MAX_LOGGED_STATEMENTS = 50
+# Seconds between two writes of the numbers of a worker to its file
+DUMP_SECONDS = 1.0
+
+
+class Histogram:
+    """Prometheus histogram with labels, thread-safe."""
+
+    def __init__(self, name: str, help: str, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., +Inf count], sum
+        self._counts = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._sums = defaultdict(float)
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[labels][index] += 1
+            self._sums[labels] += value
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts)) for labels, counts in self._counts.items()]
+            sums = dict(self._sums)
+        for labels, counts in sorted(items):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket = ",".join(filter(None, (base, f'le="{bound}"')))
+                lines.append(f"{self.name}_bucket{{{bucket}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{base}}} {sums[labels]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+    def snapshot(self) -> list:
+        """The numbers of the histogram, JSON serializable."""
+        with self._lock:
+            return [
+                [list(labels), list(counts), self._sums[labels]]
+                for labels, counts in self._counts.items()
+            ]
+
+    def merge(self, snapshot: list) -> None:
+        """Add the numbers of a snapshot of another worker."""
+        with self._lock:
+            for labels, counts, total in snapshot:
+                labels = tuple(labels)
+                merged = self._counts[labels]
+                for index, count in enumerate(counts):
+                    merged[index] += count
+                self._sums[labels] += total
+
+
+class Counter:
+    """Prometheus counter with labels, thread-safe."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(label_names, labels)}}} {value}")
+        return lines
+
+    def snapshot(self) -> list:
+        """The values of the counter, JSON serializable."""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def merge(self, snapshot: list) -> None:
+        """Add the values of a snapshot of another worker."""
+        with self._lock:
+            for labels, value in snapshot:
+                self._values[tuple(labels)] += value
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+class _RequestState(threading.local):
+    # What the request running in this thread (or greenlet) did
+    active = False
+    sql_count = 0
+    sql_seconds = 0.0
+    template_seconds = 0.0
+    statements = None
+    sql_started = None
+    template_started = None
+
+
+class MetricsMiddleware:
+    """WSGI middleware timing the requests, see RequestMetrics."""
+
+    def __init__(self, wsgi_app, metrics):
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+
+    def __call__(self, environ, start_response):
+        state = self.metrics.state
+        state.active = True
+        state.sql_count = 0
+        state.sql_seconds = 0.0
+        state.template_seconds = 0.0
+        state.statements = []
+        start = time.perf_counter()
+        status = []
+
+        def capture_status(code, headers, exc_info=None):
+            status.append(code.split(" ", 1)[0])
+            return start_response(code, headers, exc_info)
+
+        def finish():
+            # Runs once the body is sent, streamed responses included
+            state.active = False
+            self.metrics.record(
+                environ, status[0] if status else "500", time.perf_counter() - start
+            )
+
+        try:
+            body = self.wsgi_app(environ, capture_status)
+        except Exception:
+            finish()
+            raise
+        return ClosingIterator(body, finish)
+
+
+class RequestMetrics:
+    """Latency, SQL and template time of the requests, on ``/metrics``."""
+
+    label_names = ("endpoint", "method", "status")
+
+    def __init__(self, app=None, db=None):
+        self.state = _RequestState()
+        self.slow_request_seconds = 1.0
+        self.multiproc_dir = None
+        self._dump_lock = threading.Lock()
+        self._dumped_at = 0.0
+        (
+            self.duration,
+            self.sql_queries,
+            self.sql_seconds,
+            self.template_seconds,
+        ) = self._new_metrics()
+        if app is not None:
+            self.init_app(app, db)
+
+    @staticmethod
+    def _new_metrics() -> tuple:
+        return (
+            Histogram("flask_request_duration_seconds", "Time to serve a request."),
+            Counter("flask_sql_queries_total", "SQL statements sent to the database."),
+            Counter("flask_sql_seconds_total", "Time spent on SQL statements."),
+            Counter(
+                "flask_template_render_seconds_total",
+                "Time spent rendering templates.",
+            ),
+        )
+
+    @property
+    def metrics(self) -> tuple:
+        return (
+            self.duration,
+            self.sql_queries,
+            self.sql_seconds,
+            self.template_seconds,
+        )
+
+    def init_app(self, app, db):
+        app.extensions["request_metrics"] = self
+        if not app.config.get("METRICS_ENABLED", False):
+            return
+        self.slow_request_seconds = app.config.get("METRICS_SLOW_REQUEST_SECONDS", 1.0)
+        self.multiproc_dir = app.config.get("METRICS_MULTIPROC_DIR")
+        if self.multiproc_dir:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+
+        app.before_request(self._record_endpoint)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", self._sql_started)
+                event.listen(engine, "after_cursor_execute", self._sql_finished)
+        app.add_url_rule("/metrics", "metrics", self.view)
+        app.wsgi_app = MetricsMiddleware(app.wsgi_app, self)
+
+    @staticmethod
+    def _record_endpoint():
+        request.environ[ENDPOINT_KEY] = request.endpoint
+
+    def _template_started(self, sender, template, context, **extra):
+        self.state.template_started = time.perf_counter()
+
+    def _template_finished(self, sender, template, context, **extra):
+        if self.state.active and self.state.template_started is not None:
+            self.state.template_seconds += (
+                time.perf_counter() - self.state.template_started
+            )
+            self.state.template_started = None
+
+    def _sql_started(self, conn, cursor, statement, parameters, context, many):
+        self.state.sql_started = time.perf_counter()
+
+    def _sql_finished(self, conn, cursor, statement, parameters, context, many):
+        state = self.state
+        if not state.active or state.sql_started is None:
+            return
+        elapsed = time.perf_counter() - state.sql_started
+        state.sql_started = None
+        state.sql_count += 1
+        state.sql_seconds += elapsed
+        if len(state.statements) < MAX_LOGGED_STATEMENTS:
+            state.statements.append((elapsed, statement))
+
+    def record(self, environ, status: str, seconds: float) -> None:
+        """Account a finished request, logging it if slow."""
+        state = self.state
+        endpoint = environ.get(ENDPOINT_KEY) or "unmatched"
+        labels = (endpoint, environ.get("REQUEST_METHOD", ""), status)
+        self.duration.observe(labels, seconds)
+        self.sql_queries.inc(labels, state.sql_count)
+        self.sql_seconds.inc(labels, state.sql_seconds)
+        self.template_seconds.inc(labels, state.template_seconds)
+        if self.multiproc_dir and time.monotonic() - self._dumped_at >= DUMP_SECONDS:
+            self.dump()
+
+        if seconds >= self.slow_request_seconds:
+            logger.warning(
+                "Slow request %s %s (%s) took %.3fs: %d queries in %.3fs, "
+                "templates %.3fs\n%s",
+                environ.get("REQUEST_METHOD"),
+                environ.get("PATH_INFO"),
+                endpoint,
+                seconds,
+                state.sql_count,
+                state.sql_seconds,
+                state.template_seconds,
+                "\n".join(
+                    f"  {elapsed * 1000:.1f}ms {' '.join(statement.split())}"
+                    for elapsed, statement in state.statements
+                ),
+            )
+
+    def dump(self) -> None:
+        """Write the numbers of this worker to its file of METRICS_MULTIPROC_DIR."""
+        if not self.multiproc_dir:
+            return
+        path = os.path.join(self.multiproc_dir, f"{os.getpid()}.json")
+        with self._dump_lock:
+            self._dumped_at = time.monotonic()
+            snapshot = {metric.name: metric.snapshot() for metric in self.metrics}
+            # Replaced in one step, a scrape never reads a half written file
+            with open(f"{path}.tmp", "w") as file:
+                json.dump(snapshot, file)
+            os.replace(f"{path}.tmp", path)
+
+    def collect(self) -> tuple:
+        """The metrics of all the workers, or of this one without a directory."""
+        if not self.multiproc_dir:
+            return self.metrics
+        self.dump()
+        metrics = self._new_metrics()
+        for path in glob.glob(os.path.join(self.multiproc_dir, "*.json")):
+            with open(path) as file:
+                snapshot = json.load(file)
+            for metric in metrics:
+                metric.merge(snapshot.get(metric.name, []))
+        return metrics
+
+    def render(self) -> str:
+        """All the metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.collect():
+            lines.extend(metric.render(self.label_names))
+        return "\n".join(lines) + "\n"
+
+    def view(self):
+        return Response(
+            self.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -1,10 +1,29 @@
+import hashlib
+from datetime import datetime
+
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm import validates
 
 from . import db
 
 
+def email_hashing(email: str) -> str:
+    """Provide an email address and return and MD5 hashed string.
+
+    Args:
+        email (str): Email address to be hashed.
+
+    Returns:
+        str: MD5 hashed string.
+    """
+    # strip blanks, convert to lower case and encode in utf-8
+    # encode as md5 and format as hex
+    return hashlib.md5(email.strip().lower().encode("utf-8")).hexdigest()
+
+
 class BlogPost(db.Model):
     __tablename__ = "blog_posts"
     id = db.Column(db.Integer, primary_key=True)
@@ -15,12 +34,17 @@ class BlogPost(db.Model):
     body = db.Column(db.Text, nullable=False)
     img_url = db.Column(db.String(250), nullable=False)
     # browser firendly blog url. Instead of using id like /post/5
-    blog_title_str = db.Column(db.String(250), nullable=False)
+    # Every post route resolves the post by this slug, so keep it indexed
+    blog_title_str = db.Column(db.String(250), unique=True, index=True, nullable=False)
     # Create relationship with User table
     author_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     is_draft = db.Column(db.Boolean, default=False)
     post_views = db.Column(db.Integer, default=0)
     post_likes = db.Column(db.Integer, default=0)
+    # Last change of the post, for the ETag of its pages
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
     author = relationship("User", back_populates="posts")
     # Create a relationship with Comment table
     comments = relationship("Comment", back_populates="blog_posts")
@@ -32,11 +56,18 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(250), unique=True, nullable=False)
     name = db.Column(db.String(250), nullable=False)
     password = db.Column(db.String(250), nullable=False)
+    # Gravatar hash of the email, computed once when the email is set
+    avatar_hash = db.Column(db.String(32))
     # Create relationship with BlogPost table
     posts = relationship("BlogPost", back_populates="author")
     # Create relationshipb with Comment table
     comments = relationship("Comment", back_populates="comment_author")
 
+    @validates("email")
+    def validate_email(self, key, email):
+        self.avatar_hash = email_hashing(email)
+        return email
+
 
 class Comment(db.Model):
     __tablename__ = "comments"
@@ -46,5 +77,47 @@ class Comment(db.Model):
     author_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     comment_author = relationship("User", back_populates="comments")
     # Create relationship with BlogPost table
-    blog_post_id = db.Column(db.Integer, db.ForeignKey("blog_posts.id"))
+    # The comments of a post are looked up by it
+    blog_post_id = db.Column(db.Integer, db.ForeignKey("blog_posts.id"), index=True)
     blog_posts = relationship("BlogPost", back_populates="comments")
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+
+class SearchPosting(db.Model):
+    """One term of the search index of a post, see application/search.py."""
+
+    __tablename__ = "search_postings"
+    # Compared byte for byte, the default collation of MySQL would take terms
+    # differing by case or accents for the same primary key
+    term = db.Column(
+        db.String(64).with_variant(
+            mysql.VARCHAR(64, charset="utf8mb4", collation="utf8mb4_bin"), "mysql"
+        ),
+        primary_key=True,
+    )
+    post_id = db.Column(db.Integer, primary_key=True, index=True)
+    # Occurrences of the term in the post, weighted by field (title, subtitle, body)
+    frequency = db.Column(db.Integer, nullable=False)
+    # Copy of SearchDocument.length so ranking needs a single lookup
+    doc_length = db.Column(db.Integer, nullable=False)
+
+
+class SearchDocument(db.Model):
+    """A post in the search index, with its weighted length in terms."""
+
+    __tablename__ = "search_documents"
+    post_id = db.Column(db.Integer, primary_key=True)
+    length = db.Column(db.Integer, nullable=False)
+
+
+class ServerSessionRecord(db.Model):
+    """Session of the "db" SESSION_BACKEND, see application/sessions.py."""
+
+    __tablename__ = "sessions"
+    # Random id signed in the session cookie
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    # Expired sessions are ignored, then purged
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,196 @@
+"""Password hashing off the request thread, and login throttling.
+
+Hashing a password is the most expensive thing a request does (hundreds of
+milliseconds of CPU with pbkdf2). PasswordHasher runs it on a small pool of
+threads per worker process (``PASSWORD_HASH_WORKERS``): hashlib releases the
+GIL while hashing, so with gthread or gevent workers the other requests of the
+worker keep being served. At most ``PASSWORD_HASH_QUEUE`` hashes wait for the
+pool, further logins are turned away with a 503 instead of piling up.
+
+The algorithm is set with ``PASSWORD_HASH_METHOD`` and
+``PASSWORD_SALT_LENGTH``. Hashes made with other parameters still verify and
+are replaced on the next successful login.
+
+LoginThrottle counts the failed logins and the registrations of each client IP
+over ``LOGIN_THROTTLE_WINDOW`` seconds and rejects the client before any hash
+work once it reaches ``LOGIN_THROTTLE_MAX_ATTEMPTS``. The counts are kept per
+worker process.
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request
+from werkzeug.security import check_password_hash
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+from werkzeug.security import generate_password_hash
+
+# Default parameters werkzeug fills in when a method leaves them out
+_SCRYPT_DEFAULTS = ("32768", "8", "1")
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashes are already waiting for the pool."""
+
+
+def full_method(method: str) -> str:
+    """Spell out the parameters of a werkzeug hash method.
+
+    Args:
+        method (str): e.g. "pbkdf2", "pbkdf2:sha256" or "scrypt:16384:8:1".
+
+    Returns:
+        str: The method as written in the hashes, e.g. "pbkdf2:sha256:600000".
+    """
+    parts = method.split(":")
+    if parts[0] == "pbkdf2":
+        if len(parts) == 1:
+            parts.append("sha256")
+        if len(parts) == 2:
+            parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    elif parts[0] == "scrypt" and len(parts) == 1:
+        parts.extend(_SCRYPT_DEFAULTS)
+    return ":".join(parts)
+
+
+def _gevent_patched() -> bool:
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+class PasswordHasher:
+    """Hash and verify passwords on a bounded pool of threads."""
+
+    def __init__(self, app=None):
+        self.method = full_method("pbkdf2:sha256")
+        self.salt_length = 16
+        self.max_pending = 8
+        self._workers = 1
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["password_hasher"] = self
+        self.method = full_method(app.config.get("PASSWORD_HASH_METHOD", "pbkdf2"))
+        self.salt_length = app.config.get("PASSWORD_SALT_LENGTH", 16)
+        self._workers = app.config.get("PASSWORD_HASH_WORKERS", 1)
+        self.max_pending = app.config.get("PASSWORD_HASH_QUEUE", 8)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            if _gevent_patched():
+                # The threads of the executor would be greenlets, hash on the
+                # native threads of the hub instead
+                import gevent
+
+                return gevent.get_hub().threadpool.apply(function, args)
+            if self._executor is None:
+                # Created on first use, after gunicorn forked the worker
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="password-hash"
+                )
+            return self._executor.submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured method.
+
+        Args:
+            password (str): The password in clear.
+
+        Raises:
+            HashingBusy: Too many hashes are waiting already.
+
+        Returns:
+            str: The hash to store in User.password.
+        """
+        return self._run(
+            generate_password_hash, password, self.method, self.salt_length
+        )
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Check a password against a stored hash, whatever its method.
+
+        Raises:
+            HashingBusy: Too many hashes are waiting already.
+        """
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Tell if a stored hash was made with other parameters than configured."""
+        if pwhash.count("$") < 2:
+            return True
+        method, salt, _ = pwhash.split("$", 2)
+        return method != self.method or len(salt) != self.salt_length
+
+
+class LoginThrottle:
+    """Fixed window count of the failed logins per client IP."""
+
+    def __init__(self, app=None):
+        self.max_attempts = 10
+        self.window = 300
+        self.trusted_proxies = 1
+        self._lock = threading.Lock()
+        # ip -> (window start, attempts)
+        self._attempts = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["login_throttle"] = self
+        self.max_attempts = app.config.get("LOGIN_THROTTLE_MAX_ATTEMPTS", 10)
+        self.window = app.config.get("LOGIN_THROTTLE_WINDOW", 300)
+        self.trusted_proxies = app.config.get("TRUSTED_PROXIES", 1)
+
+    def client_ip(self) -> str:
+        """IP of the client, as seen by the first of the trusted proxies."""
+        if self.trusted_proxies <= 0 or "X-Forwarded-For" not in request.headers:
+            return request.remote_addr
+        # access_route is the X-Forwarded-For list, each of our proxies appended
+        # the address it got the request from. The entries left of those can be
+        # forged by the client
+        route = request.access_route
+        return route[max(-self.trusted_proxies, -len(route))]
+
+    def retry_after(self, ip: str) -> int:
+        """Seconds until the client may try again, 0 if it is not throttled."""
+        if self.max_attempts <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            started, attempts = self._attempts.get(ip, (now, 0))
+            if now - started >= self.window:
+                self._attempts.pop(ip, None)
+                return 0
+            if attempts < self.max_attempts:
+                return 0
+            return int(self.window - (now - started)) + 1
+
+    def failed(self, ip: str) -> None:
+        """Count a failed login (or a registration) of a client."""
+        now = time.monotonic()
+        with self._lock:
+            started, attempts = self._attempts.get(ip, (now, 0))
+            if now - started >= self.window:
+                started, attempts = now, 0
+            self._attempts[ip] = (started, attempts + 1)
+            # Forget the clients whose window is over, the dict stays small
+            if len(self._attempts) > 10000:
+                self._attempts = {
+                    key: value
+                    for key, value in self._attempts.items()
+                    if now - value[0] < self.window
+                }
+
+    def reset(self, ip: str) -> None:
+        """Forget the failures of a client that just logged in."""
+        with self._lock:
+            self._attempts.pop(ip, None)
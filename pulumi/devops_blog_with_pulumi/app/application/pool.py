@@ -0,0 +1,123 @@
+"""Connection pool metrics.
+
+Pooled engines (see SQLALCHEMY_ENGINE_OPTIONS in config.py) are built with
+InstrumentedQueuePool, which records how long requests wait to check a
+connection out of the pool. Together with the pool counters (checked out,
+overflow) they are served as JSON on ``/pool-metrics`` so pool sizes can be
+checked against the Aurora connection limit:
+``workers * pods * (pool_size + max_overflow)``.
+"""
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool keeping count of checkouts, their wait time and timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def recreate(self):
+        # Keep the numbers across a dispose(), e.g. after an Aurora failover
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.timeouts = self.timeouts
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.wait_seconds_max = self.wait_seconds_max
+        return pool
+
+
+def pool_stats(engine) -> dict:
+    """Return the current numbers of the pool of an engine.
+
+    Args:
+        engine: SQLAlchemy engine.
+
+    Returns:
+        dict: Pool counters, wait times are only there for instrumented pools.
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                wait_seconds_total=round(pool.wait_seconds_total, 6),
+                wait_seconds_max=round(pool.wait_seconds_max, 6),
+            )
+    return stats
+
+
+class PoolMetrics:
+    """Serve the pool numbers of every engine of the app on ``/pool-metrics``.
+
+    Enabled with ``POOL_METRICS_ENABLED``. Must be initialised before the
+    SQLAlchemy extension so the engines get the instrumented pool.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._db = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self._db = db
+        app.extensions["pool_metrics"] = self
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = self._instrument(
+            app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        )
+        app.config["SQLALCHEMY_BINDS"] = {
+            key: self._instrument(value) if isinstance(value, dict) else value
+            for key, value in app.config.get("SQLALCHEMY_BINDS", {}).items()
+        }
+        if app.config.get("POOL_METRICS_ENABLED", False):
+            app.add_url_rule("/pool-metrics", "pool_metrics", self.view)
+
+    @staticmethod
+    def _instrument(options: dict) -> dict:
+        # Only engines with a sized pool (MySQL), SQLite keeps its own pool
+        if "pool_size" in options and "poolclass" not in options:
+            return {**options, "poolclass": InstrumentedQueuePool}
+        return options
+
+    def snapshot(self) -> dict:
+        """Pool numbers keyed by bind name, "default" for the main database."""
+        return {
+            bind or "default": pool_stats(engine)
+            for bind, engine in self._db.engines.items()
+        }
+
+    def view(self):
+        return jsonify(self.snapshot())
@@ -0,0 +1,214 @@
+"""Queries shared by the views."""
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import load_only
+
+from . import db
+from . import post_counters
+from .models import BlogPost
+from .models import Comment
+from .models import User
+
+
+def load_post_page(post_name: str) -> BlogPost:
+    """Given a post name, fetch the post and its author in a single query.
+    The comments are loaded by pages, see load_comments_page.
+
+    Args:
+        post_name (str): The post name (slug) to be fetched.
+
+    Returns:
+        BlogPost: The post with its author already loaded, or None.
+    """
+    return (
+        BlogPost.query.options(joinedload(BlogPost.author))
+        .filter_by(blog_title_str=post_name)
+        .first()
+    )
+
+
+class CommentsPage(NamedTuple):
+    """A page of the comments of a post, oldest first."""
+
+    comments: List[Comment]
+    # id to pass as "after" to get the next page, None on the last page
+    next: Optional[int]
+
+
+def load_comments_page(
+    post_id: int, after: int = None, per_page: int = 20
+) -> CommentsPage:
+    """Given a post id, fetch one page of its comments with their authors in a
+    single query, using the comment id as the cursor.
+
+    Args:
+        post_id (int): Id of the post the comments belong to.
+        after (int, optional): Return the comments after this comment id.
+        per_page (int, optional): Number of comments per page. Defaults to 20.
+
+    Returns:
+        CommentsPage: The comments of the page and the cursor to the next one.
+    """
+    query = Comment.query.options(
+        joinedload(Comment.comment_author).load_only(User.name, User.avatar_hash)
+    ).filter(Comment.blog_post_id == post_id)
+    if after is not None:
+        query = query.filter(Comment.id > after)
+    # Fetch one extra comment to know if there is a page after this one
+    comments = query.order_by(Comment.id.asc()).limit(per_page + 1).all()
+    has_next = len(comments) > per_page
+    comments = comments[:per_page]
+    return CommentsPage(comments=comments, next=comments[-1].id if has_next else None)
+
+
+def load_post_version(post_name: str):
+    """Given a post name, fetch what the page of the post depends on, without
+    its body or comments: its id, draft flag, author, updated_at and the number
+    and last change of its comments.
+
+    Args:
+        post_name (str): The post name (slug).
+
+    Returns:
+        Row: id, is_draft, author_id, updated_at, comment_count and
+        comment_updated_at, or None if there is no such post.
+    """
+    return (
+        db.session.query(
+            BlogPost.id,
+            BlogPost.is_draft,
+            BlogPost.author_id,
+            BlogPost.updated_at,
+            func.count(Comment.id).label("comment_count"),
+            func.max(Comment.updated_at).label("comment_updated_at"),
+        )
+        .outerjoin(Comment, Comment.blog_post_id == BlogPost.id)
+        .filter(BlogPost.blog_title_str == post_name)
+        .group_by(BlogPost.id)
+        .first()
+    )
+
+
+def load_posts_version(**filters):
+    """Given the filters of a post listing, fetch the number of posts and the
+    last change of any of them, which every page of the listing depends on.
+
+    Returns:
+        Row: post_count and updated_at.
+    """
+    return (
+        db.session.query(
+            func.count(BlogPost.id).label("post_count"),
+            func.max(BlogPost.updated_at).label("updated_at"),
+        )
+        .filter_by(**filters)
+        .one()
+    )
+
+
+# Only the columns shown on the post cards of the listings
+_CARD_OPTIONS = (
+    load_only(
+        BlogPost.id,
+        BlogPost.title,
+        BlogPost.subtitle,
+        BlogPost.date,
+        BlogPost.blog_title_str,
+        BlogPost.is_draft,
+        BlogPost.post_views,
+        BlogPost.post_likes,
+    ),
+    joinedload(BlogPost.author).load_only(User.name),
+)
+
+
+class PostsPage(NamedTuple):
+    """A page of the post listing with the cursors to its neighbours."""
+
+    posts: List[BlogPost]
+    # id to pass as "after" to get the newer page, None on the first page
+    newer: Optional[int]
+    # id to pass as "before" to get the older page, None on the last page
+    older: Optional[int]
+
+
+def load_posts_page(
+    query, before: int = None, after: int = None, per_page: int = 10
+) -> PostsPage:
+    """Given a post query, fetch one page of it, newest first, using the post id
+    as the cursor. Only the columns shown on the index cards are loaded.
+
+    Args:
+        query: BlogPost query with the filters of the listing already applied.
+        before (int, optional): Return the posts older than this post id.
+        after (int, optional): Return the posts newer than this post id.
+        per_page (int, optional): Number of posts per page. Defaults to 10.
+
+    Returns:
+        PostsPage: The posts of the page and the cursors to the next ones.
+    """
+    query = query.options(*_CARD_OPTIONS)
+    # Fetch one extra post to know if there is a page after this one
+    if after is not None:
+        posts = (
+            query.filter(BlogPost.id > after)
+            .order_by(BlogPost.id.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_newer = len(posts) > per_page
+        posts = posts[:per_page][::-1]
+        has_older = True
+    else:
+        if before is not None:
+            query = query.filter(BlogPost.id < before)
+        posts = query.order_by(BlogPost.id.desc()).limit(per_page + 1).all()
+        has_older = len(posts) > per_page
+        posts = posts[:per_page]
+        has_newer = before is not None
+
+    return PostsPage(
+        posts=posts,
+        newer=posts[0].id if posts and has_newer else None,
+        older=posts[-1].id if posts and has_older else None,
+    )
+
+
+def load_search_results(results: List[Tuple[int, float]]) -> List[BlogPost]:
+    """Given ranked search results, fetch their published posts in rank order,
+    with only the columns shown on the index cards.
+
+    Args:
+        results (List[Tuple[int, float]]): Post ids and scores, best first.
+
+    Returns:
+        List[BlogPost]: The posts, best match first.
+    """
+    if not results:
+        return []
+    post_ids = [post_id for post_id, _ in results]
+    posts = (
+        BlogPost.query.options(*_CARD_OPTIONS)
+        .filter(BlogPost.id.in_(post_ids))
+        .filter_by(is_draft=False)
+        .all()
+    )
+    rank = {post_id: position for position, post_id in enumerate(post_ids)}
+    return sorted(posts, key=lambda post: rank[post.id])
+
+
+def add_post_view(post: BlogPost) -> None:
+    """Given a post, increase its view count by 1 every time is viewed.
+
+    The increment is buffered and written back by the post counters,
+    see application/counters.py.
+
+    Args:
+        post (BlogPost): The already loaded post to be updated.
+    """
+    post_counters.incr(post.id, "post_views")
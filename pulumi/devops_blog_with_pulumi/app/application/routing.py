@@ -0,0 +1,85 @@
+"""Read replica routing.
+
+When a ``reader`` bind is configured (``SQLALCHEMY_BINDS``, pointing at the
+Aurora reader endpoint), the GET requests of the views decorated with
+``use_reader`` run their queries on it; everything else, and any statement
+that writes, goes to the writer. A client that just wrote is kept on the
+writer for ``DB_READER_STICKY_SECONDS`` so it reads its own writes despite
+replica lag.
+"""
+import time
+from functools import wraps
+
+from flask import g
+from flask import has_request_context
+from flask import request
+from flask import session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+READER_BIND = "reader"
+
+# Key of the Flask session holding until when the client sticks to the writer
+_STICKY_KEY = "_db_writer_until"
+
+
+def use_reader(func):
+    """Run the queries of the GET requests of a view on the reader bind."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        g.db_use_reader = request.method in ("GET", "HEAD")
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Session sending the reads of read only requests to the reader bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            # INSERT, UPDATE or DELETE statements always go to the writer
+            _mark_write()
+        elif bind is None and self._use_reader():
+            return self._db.engines[READER_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_reader(self) -> bool:
+        if not has_request_context() or not g.get("db_use_reader", False):
+            return False
+        if self._flushing:
+            return False
+        if READER_BIND not in self._db.engines:
+            return False
+        return session.get(_STICKY_KEY, 0) < time.time()
+
+
+def _mark_write(*args):
+    if has_request_context():
+        g.db_wrote = True
+
+
+# Flushing the ORM changes writes as well
+event.listen(RoutingSession, "after_flush", _mark_write)
+
+
+class ReplicaRouter:
+    """Keep the clients that just wrote on the writer for a few seconds."""
+
+    def __init__(self, app=None):
+        self.sticky_seconds = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.sticky_seconds = app.config.get("DB_READER_STICKY_SECONDS", 10)
+        app.extensions["replica_router"] = self
+        if READER_BIND in app.config.get("SQLALCHEMY_BINDS", {}):
+            app.after_request(self._stick_to_writer)
+
+    def _stick_to_writer(self, response):
+        if g.get("db_wrote", False):
+            session[_STICKY_KEY] = time.time() + self.sticky_seconds
+        return response
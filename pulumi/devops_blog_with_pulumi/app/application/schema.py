@@ -0,0 +1,110 @@
+"""Schema migration commands.
+
+``flask schema upgrade`` is meant to run once per deploy, from a Kubernetes
+Job or an init container. It takes a MySQL advisory lock so that only one
+runner migrates, the others wait for the lock and find the schema up to date.
+
+``flask schema wait`` is what the app containers run before starting
+gunicorn (MIGRATION_MODE=wait in boot.sh): it only polls the schema version
+until it matches the head revision of the migrations, without migrating.
+"""
+import time
+from contextlib import contextmanager
+
+import click
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask.cli import AppGroup
+from flask_migrate import upgrade
+
+schema_cli = AppGroup("schema", help="Migrate or wait for the DB schema.")
+
+# Name of the MySQL advisory lock held while migrating
+LOCK_NAME = "flask-blog-schema-migration"
+
+
+def head_revision() -> str:
+    """Return the head revision of the migrations directory."""
+    migrate = current_app.extensions["migrate"]
+    config = migrate.migrate.get_config(migrate.directory)
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def current_revision(engine) -> str:
+    """Return the revision the database is at, None if it was never migrated."""
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+@contextmanager
+def advisory_lock(engine, timeout: int):
+    """Hold a MySQL named lock, other dialects (SQLite) have a single writer.
+
+    Args:
+        engine: SQLAlchemy engine of the database to be migrated.
+        timeout (int): Seconds to wait for the lock.
+
+    Raises:
+        click.ClickException: If the lock is not acquired within the timeout.
+    """
+    if engine.dialect.name != "mysql":
+        yield
+        return
+
+    with engine.connect() as connection:
+        acquired = connection.exec_driver_sql(
+            "SELECT GET_LOCK(%s, %s)", (LOCK_NAME, timeout)
+        ).scalar()
+        if acquired != 1:
+            raise click.ClickException(
+                f"Could not get the migration lock in {timeout} seconds"
+            )
+        try:
+            yield
+        finally:
+            connection.exec_driver_sql("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+
+
+@schema_cli.command("upgrade")
+@click.option("--lock-timeout", default=600, help="Seconds to wait for the lock.")
+def upgrade_command(lock_timeout):
+    """Upgrade the schema to the head revision, one runner at a time."""
+    start = time.monotonic()
+    engine = current_app.extensions["migrate"].db.engine
+    with advisory_lock(engine, lock_timeout):
+        locked = time.monotonic()
+        head = head_revision()
+        if current_revision(engine) == head:
+            click.echo(f"Schema already at {head}")
+        else:
+            upgrade()
+            click.echo(f"Schema upgraded to {head}")
+    done = time.monotonic()
+    click.echo(
+        f"Waited {locked - start:.2f}s for the lock, migrated in {done - locked:.2f}s"
+    )
+
+
+@schema_cli.command("wait")
+@click.option("--timeout", default=300, help="Seconds to wait for the schema.")
+@click.option("--interval", default=2.0, help="Seconds between checks.")
+def wait_command(timeout, interval):
+    """Wait until the schema is at the head revision, without migrating."""
+    start = time.monotonic()
+    engine = current_app.extensions["migrate"].db.engine
+    head = head_revision()
+    while True:
+        try:
+            revision = current_revision(engine)
+        except Exception as error:  # DB not reachable yet
+            revision = None
+            click.echo(f"Could not read the schema version: {error}")
+        if revision == head:
+            click.echo(f"Schema at {head} after {time.monotonic() - start:.2f}s")
+            return
+        if time.monotonic() - start > timeout:
+            raise click.ClickException(
+                f"Schema still at {revision} instead of {head} after {timeout}s"
+            )
+        time.sleep(interval)
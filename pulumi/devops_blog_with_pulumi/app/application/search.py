@@ -0,0 +1,248 @@
+"""Full-text search over the published posts.
+
+Posts are tokenized into an inverted index stored in the database, so every
+worker and pod shares it:
+
+* ``search_postings``: one row per (term, post) with the weighted frequency of
+  the term in the post and the length of the post, primary key on the term.
+* ``search_documents``: one row per indexed post with its length, used for the
+  collection size and average length of BM25.
+
+A search only reads the postings of its terms through the primary key, the
+Text columns of ``blog_posts`` are never scanned. The admin views update the
+index in the same transaction as the post, ``flask search reindex`` rebuilds
+it from scratch.
+"""
+import heapq
+import html
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import List
+from typing import Tuple
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import select
+
+search_cli = AppGroup("search", help="Manage the full-text search index.")
+
+# Weight of a term found in each field, a title match counts as three body ones
+FIELD_WEIGHTS = (("title", 3), ("subtitle", 2), ("body", 1))
+
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+
+# Longest term kept, longer ones are cut to fit SearchPosting.term
+MAX_TERM_LENGTH = 64
+# Terms of a query beyond these are ignored
+MAX_QUERY_TERMS = 8
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its of on "
+    "or so that the their then there these this to was we were will with you".split()
+)
+
+
+def fold(text: str) -> str:
+    """Case fold a text and strip its accents, "Straße Résumé" is "strasse resume"."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into folded index terms, without markup or stop words.
+
+    Terms differing only by case or accents are the same term, see fold.
+
+    Args:
+        text (str): Plain text or the HTML of a post body.
+
+    Returns:
+        List[str]: The terms, in order and with repetitions.
+    """
+    if not text:
+        return []
+    # CKEditor writes entities, &nbsp; and &eacute; are a space and a letter
+    text = fold(html.unescape(_TAG_RE.sub(" ", text)))
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in _TOKEN_RE.findall(text)
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def post_terms(post) -> Counter:
+    """Count the weighted terms of the title, subtitle and body of a post."""
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(getattr(post, field)):
+            terms[term] += weight
+    return terms
+
+
+class SearchIndex:
+    """BM25 ranked search over the inverted index of the posts.
+
+    The number of indexed posts and their average length are cached per
+    process for ``SEARCH_STATS_TTL`` seconds, they barely move between posts.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._db = None
+        self.stats_ttl = 60
+        self._stats = None
+        self._stats_expires = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self._db = db
+        self.stats_ttl = app.config.get("SEARCH_STATS_TTL", 60)
+        app.extensions["search_index"] = self
+        app.cli.add_command(search_cli)
+
+    def index_post(self, post) -> None:
+        """Add or replace a post in the index, drafts are taken out of it.
+
+        Runs in the session of the caller, the changes are committed with the
+        post.
+
+        Args:
+            post (BlogPost): The new or edited post.
+        """
+        from .models import SearchDocument
+        from .models import SearchPosting
+
+        session = self._db.session
+        # Assigns the id of a new post
+        session.flush()
+        self._remove(post.id)
+        if not post.is_draft:
+            terms = post_terms(post)
+            length = sum(terms.values())
+            if terms:
+                session.execute(
+                    insert(SearchPosting),
+                    [
+                        {
+                            "term": term,
+                            "post_id": post.id,
+                            "frequency": frequency,
+                            "doc_length": length,
+                        }
+                        for term, frequency in terms.items()
+                    ],
+                )
+            session.add(SearchDocument(post_id=post.id, length=length))
+        self._expire_stats()
+
+    def remove_post(self, post_id: int) -> None:
+        """Take a post out of the index, in the session of the caller.
+
+        Args:
+            post_id (int): Id of the deleted post.
+        """
+        self._remove(post_id)
+        self._expire_stats()
+
+    def _remove(self, post_id):
+        from .models import SearchDocument
+        from .models import SearchPosting
+
+        session = self._db.session
+        session.execute(delete(SearchPosting).where(SearchPosting.post_id == post_id))
+        session.execute(delete(SearchDocument).where(SearchDocument.post_id == post_id))
+
+    def _expire_stats(self):
+        with self._lock:
+            self._stats = None
+
+    def stats(self) -> Tuple[int, float]:
+        """Return the number of indexed posts and their average length."""
+        from .models import SearchDocument
+
+        with self._lock:
+            if self._stats is not None and time.monotonic() < self._stats_expires:
+                return self._stats
+        count, total = self._db.session.execute(
+            select(func.count(), func.coalesce(func.sum(SearchDocument.length), 0))
+        ).one()
+        stats = (count, total / count if count else 0.0)
+        with self._lock:
+            self._stats = stats
+            self._stats_expires = time.monotonic() + self.stats_ttl
+        return stats
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """Rank the posts matching any term of a query with BM25.
+
+        Args:
+            query (str): The text typed by the reader.
+            limit (int, optional): Maximum number of results. Defaults to 20.
+
+        Returns:
+            List[Tuple[int, float]]: Post ids and their scores, best first.
+        """
+        from .models import SearchPosting
+
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        postings = self._db.session.execute(
+            select(
+                SearchPosting.term,
+                SearchPosting.post_id,
+                SearchPosting.frequency,
+                SearchPosting.doc_length,
+            ).where(SearchPosting.term.in_(terms))
+        ).all()
+        if not postings:
+            return []
+
+        count, average_length = self.stats()
+        document_frequency = Counter(posting.term for posting in postings)
+        scores = Counter()
+        for term, post_id, frequency, doc_length in postings:
+            df = document_frequency[term]
+            idf = math.log(1 + (max(count, df) - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * doc_length / (average_length or doc_length))
+            scores[post_id] += idf * frequency * (K1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def reindex(self) -> int:
+        """Rebuild the whole index from the posts and commit it.
+
+        Returns:
+            int: Number of posts indexed.
+        """
+        from .models import BlogPost
+        from .models import SearchDocument
+        from .models import SearchPosting
+
+        session = self._db.session
+        session.execute(delete(SearchPosting))
+        session.execute(delete(SearchDocument))
+        posts = session.scalars(select(BlogPost).filter_by(is_draft=False)).all()
+        for post in posts:
+            self.index_post(post)
+        session.commit()
+        return len(posts)
+
+
+@search_cli.command("reindex")
+def reindex_command():
+    """Rebuild the search index from the posts in the database."""
+    indexed = current_app.extensions["search_index"].reindex()
+    click.echo(f"Indexed {indexed} posts")
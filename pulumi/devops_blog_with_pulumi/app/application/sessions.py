@@ -0,0 +1,293 @@
+"""Server-side sessions.
+
+By default Flask keeps the whole session in the signed cookie. With
+``SESSION_BACKEND`` set to ``redis`` or ``db``, the cookie only carries a
+signed random id. The session itself is kept in a Redis-compatible server
+(``SESSION_REDIS_URL``, needs the ``redis`` package) or in the ``sessions``
+table, and expires after ``SESSION_TTL`` seconds without use (or
+``PERMANENT_SESSION_LIFETIME`` for permanent sessions).
+
+Only the sessions of logged in users are stored. Anonymous sessions, which
+mostly hold the CSRF token of a login or register form, stay in the signed
+cookie as with Flask's default sessions, so visitors don't add records. A
+record is only written when the session changed, or to push its expiry back
+once half of its lifetime went by, so most requests only read it. The
+session id changes on login. The logged in user's profile is kept in the
+session, which lets ``load_user`` skip the ``users`` query (see
+``cache_profile``).
+"""
+import logging
+import secrets
+import time
+from datetime import datetime
+from datetime import timedelta
+
+from flask import session as flask_session
+from flask.sessions import SecureCookieSessionInterface
+from flask.sessions import session_json_serializer
+from flask.sessions import SessionInterface
+from flask.sessions import SessionMixin
+from flask_login import user_logged_in
+from flask_login import user_logged_out
+from itsdangerous import BadSignature
+from itsdangerous import Signer
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy import update
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+
+# Session key of the profile of the logged in user
+PROFILE_KEY = "_profile"
+# Columns of User kept in the session, never the password hash
+PROFILE_FIELDS = ("id", "email", "name", "avatar_hash")
+# Session key Flask-Login sets on login, the sessions holding it are stored
+USER_KEY = "_user_id"
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session whose contents live in a SessionStore."""
+
+    def __init__(self, initial=None, sid=None, written_at=0.0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.written_at = written_at
+        self.modified = False
+        # Set on login, the session gets a new id
+        self.regenerate = False
+
+
+class RedisSessionStore:
+    """Sessions as keys of a Redis-compatible server, expired by the server."""
+
+    def __init__(self, url: str, prefix: str = "session:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self.prefix = prefix
+
+    def load(self, sid):
+        try:
+            return self._client.get(self.prefix + sid)
+        except self._errors:
+            logger.exception("Session read failed")
+            return None
+
+    def save(self, sid, record, ttl):
+        try:
+            self._client.set(self.prefix + sid, record, ex=ttl)
+        except self._errors:
+            logger.exception("Session write failed")
+
+    def delete(self, sid):
+        try:
+            self._client.delete(self.prefix + sid)
+        except self._errors:
+            logger.exception("Session delete failed")
+
+
+class DatabaseSessionStore:
+    """Sessions as rows of the ``sessions`` table.
+
+    Runs on connections of its own, always on the writer, outside of the
+    transaction of the request. Expired rows are deleted at most every
+    ``purge_interval`` seconds per worker.
+    """
+
+    def __init__(self, db, purge_interval: int = 300):
+        self._db = db
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+
+    def load(self, sid):
+        from .models import ServerSessionRecord
+
+        with self._db.engine.connect() as connection:
+            return connection.scalar(
+                select(ServerSessionRecord.data).where(
+                    ServerSessionRecord.id == sid,
+                    ServerSessionRecord.expires_at > datetime.utcnow(),
+                )
+            )
+
+    def save(self, sid, record, ttl):
+        from .models import ServerSessionRecord
+
+        now = datetime.utcnow()
+        values = {"data": record, "expires_at": now + timedelta(seconds=ttl)}
+        with self._db.engine.begin() as connection:
+            updated = connection.execute(
+                update(ServerSessionRecord)
+                .where(ServerSessionRecord.id == sid)
+                .values(values)
+            )
+            if not updated.rowcount:
+                connection.execute(insert(ServerSessionRecord).values(id=sid, **values))
+            if time.monotonic() - self._purged_at > self.purge_interval:
+                self._purged_at = time.monotonic()
+                connection.execute(
+                    delete(ServerSessionRecord).where(
+                        ServerSessionRecord.expires_at <= now
+                    )
+                )
+
+    def delete(self, sid):
+        from .models import ServerSessionRecord
+
+        with self._db.engine.begin() as connection:
+            connection.execute(
+                delete(ServerSessionRecord).where(ServerSessionRecord.id == sid)
+            )
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keep the sessions in a store, the cookie only holds their signed id."""
+
+    def __init__(self, store, ttl: int = 86400):
+        self.store = store
+        self.ttl = ttl
+        # Signs the anonymous sessions kept in the cookie
+        self._cookie_sessions = SecureCookieSessionInterface()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="session-id")
+
+    def _set_cookie(self, app, session, response, value):
+        response.set_cookie(
+            self.get_cookie_name(app),
+            value,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+    def _lifetime(self, app, session) -> int:
+        if session.permanent:
+            return int(app.permanent_session_lifetime.total_seconds())
+        return self.ttl
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode("ascii")
+            except BadSignature:
+                sid = None
+            record = sid and self.store.load(sid)
+            if record:
+                record = session_json_serializer.loads(record)
+                return ServerSession(record["d"], sid=sid, written_at=record["t"])
+            if sid is None:
+                # An anonymous session kept in the cookie
+                serializer = self._cookie_sessions.get_signing_serializer(app)
+                max_age = int(app.permanent_session_lifetime.total_seconds())
+                try:
+                    data = serializer.loads(cookie, max_age=max_age)
+                except BadSignature:
+                    data = None
+                if data:
+                    return ServerSession(data, sid=secrets.token_urlsafe(32))
+        return ServerSession(sid=secrets.token_urlsafe(32))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if USER_KEY not in session:
+            # Anonymous or just logged out, the stored record is not needed
+            if session.written_at:
+                self.store.delete(session.sid)
+            if not session:
+                if session.modified or session.written_at:
+                    response.delete_cookie(name, domain=domain, path=path)
+            elif session.modified or session.written_at:
+                serializer = self._cookie_sessions.get_signing_serializer(app)
+                self._set_cookie(
+                    app, session, response, serializer.dumps(dict(session))
+                )
+            return
+
+        ttl = self._lifetime(app, session)
+        if session.regenerate:
+            if session.written_at:
+                self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+        stale = time.time() - session.written_at > ttl / 2
+        if not (session.modified or session.regenerate or stale):
+            return
+
+        record = session_json_serializer.dumps({"t": time.time(), "d": dict(session)})
+        self.store.save(session.sid, record, ttl)
+        self._set_cookie(
+            app, session, response, self._signer(app).sign(session.sid).decode("ascii")
+        )
+
+
+def cache_profile(session, user) -> None:
+    """Keep the profile of the logged in user in a server-side session.
+
+    Args:
+        session (ServerSession): The session of the request.
+        user (User): The user Flask-Login just loaded.
+    """
+    if not isinstance(session, ServerSession):
+        return
+    profile = {field: getattr(user, field) for field in PROFILE_FIELDS}
+    # Only mark the session modified, and so written back, on a change
+    if session.get(PROFILE_KEY) != profile:
+        session[PROFILE_KEY] = profile
+
+
+def cached_profile(session, user_id: str):
+    """Return the profile of a user kept in the session, if it is there."""
+    profile = session.get(PROFILE_KEY) if isinstance(session, ServerSession) else None
+    if profile is not None and str(profile.get("id")) == user_id:
+        return profile
+    return None
+
+
+def _regenerate_on_login(sender, user, **extra):
+    if isinstance(flask_session, ServerSession):
+        flask_session.regenerate = True
+        flask_session.pop(PROFILE_KEY, None)
+
+
+def _forget_profile(sender, user, **extra):
+    flask_session.pop(PROFILE_KEY, None)
+
+
+class SessionStore:
+    """Install the session backend selected with ``SESSION_BACKEND``."""
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.extensions["session_store"] = self
+        backend = app.config.get("SESSION_BACKEND", "cookie")
+        if backend == "redis":
+            store = RedisSessionStore(app.config["SESSION_REDIS_URL"])
+        elif backend == "db":
+            store = DatabaseSessionStore(db)
+        else:
+            # Flask's signed cookie sessions
+            return
+        app.session_interface = ServerSessionInterface(
+            store, app.config.get("SESSION_TTL", 86400)
+        )
+        user_logged_in.connect(_regenerate_on_login, app)
+        user_logged_out.connect(_forget_profile, app)
@@ -0,0 +1,33 @@
+"""Startup profile of the app factory.
+
+Every step of init_app (imports included) is timed, the numbers are kept in
+``app.extensions["startup_profile"]`` and logged when ``STARTUP_PROFILE`` is
+set, to see what a new worker spends its boot time on.
+"""
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Collect the duration of the named steps of the app startup."""
+
+    def __init__(self):
+        self.steps = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def log(self, logger) -> None:
+        for name, seconds in sorted(self.steps.items(), key=lambda step: -step[1]):
+            logger.info("startup %-16s %8.1f ms", name, seconds * 1000)
+        logger.info("startup %-16s %8.1f ms", "total", self.total * 1000)
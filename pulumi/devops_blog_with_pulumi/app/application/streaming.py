@@ -0,0 +1,75 @@
+"""Streamed rendering of the heavy pages.
+
+``stream_page`` sends a template while it renders, instead of building the
+whole page in memory first. The rendered text is written in chunks of
+``STREAM_CHUNK_SIZE`` characters, and at once wherever the template outputs
+``{{ stream_flush }}``. post.html flushes after the page head and after the
+post body. The browser starts loading the styles and shows the post while the
+comments are still being queried and rendered.
+
+The response has no Content-Length and is sent chunked. The ALB forwards the
+chunks as they come. ``X-Accel-Buffering: no`` keeps an nginx ingress from
+buffering the response, should one be put in front.
+
+The session cookie is sent before the template renders, so the CSRF token and
+the flashed messages a template may need are taken from the session first.
+"""
+from typing import Callable
+from typing import Optional
+
+from flask import current_app
+from flask import get_flashed_messages
+from flask import Response
+from flask import stream_template
+from flask import stream_with_context
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+
+# Output by the templates where the text rendered so far should be sent
+FLUSH_MARKER = Markup("<!-- stream:flush -->")
+
+
+def stream_page(
+    template_name: str, on_complete: Optional[Callable[[str], None]] = None, **context
+) -> Response:
+    """Render a template as a streamed response.
+
+    Args:
+        template_name (str): The template to render.
+        on_complete (Callable[[str], None], optional): Called with the whole
+            page once it was sent, e.g. to store it in the page cache.
+        **context: The variables of the template.
+
+    Returns:
+        Response: The streamed response.
+    """
+    chunk_size = current_app.config.get("STREAM_CHUNK_SIZE", 8192)
+    generate_csrf()
+    get_flashed_messages()
+    pieces = stream_template(template_name, stream_flush=FLUSH_MARKER, **context)
+
+    def generate():
+        buffer, size, page = [], 0, []
+        for piece in pieces:
+            flush = FLUSH_MARKER in piece
+            if flush:
+                piece = piece.replace(FLUSH_MARKER, "")
+            buffer.append(piece)
+            size += len(piece)
+            if flush or size >= chunk_size:
+                chunk = "".join(buffer)
+                buffer, size = [], 0
+                if on_complete is not None:
+                    page.append(chunk)
+                yield chunk
+        chunk = "".join(buffer)
+        if chunk:
+            if on_complete is not None:
+                page.append(chunk)
+            yield chunk
+        if on_complete is not None:
+            on_complete("".join(page))
+
+    response = Response(stream_with_context(generate()), mimetype="text/html")
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
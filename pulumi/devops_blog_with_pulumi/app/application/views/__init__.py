@@ -0,0 +1,34 @@
+"""Blueprints of the blog.
+
+The blueprint modules are only imported when they get registered, so the
+workers serving in "reader" mode (APP_MODE) never import the admin views.
+"""
+import os
+from importlib import import_module
+
+# Global varibales for 'url_for' function:
+
+app_env = os.getenv("APP_ENV")
+_EXTERNAL = True if app_env == "production" else None
+_SCHEME = "https" if app_env == "production" else None
+
+# Blueprints served in every mode
+READER_BLUEPRINTS = ("blog", "auth")
+# Blueprints only needed to write and edit posts
+EDITOR_BLUEPRINTS = ("admin",)
+
+
+def register_views(app, mode: str = "full") -> None:
+    """Import and register the blueprints needed by the serving mode.
+
+    Args:
+        app (Flask): The application.
+        mode (str, optional): "full" or "reader". Defaults to "full".
+    """
+    names = READER_BLUEPRINTS
+    if mode == "full":
+        names = names + EDITOR_BLUEPRINTS
+    for name in names:
+        app.register_blueprint(import_module(f".{name}", __name__).bp)
+    # Templates only link to the admin views when they are there
+    app.jinja_env.globals["admin_enabled"] = "admin" in app.blueprints
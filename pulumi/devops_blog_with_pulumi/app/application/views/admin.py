@@ -0,0 +1,115 @@
+"""Views to write, edit and delete posts, only for the admin user."""
+from datetime import date
+from functools import wraps
+
+from flask import abort
+from flask import Blueprint
+from flask import redirect
+from flask import render_template
+from flask import url_for
+from flask_login import current_user
+
+from .. import db
+from .. import page_cache
+from .. import search_index
+from ..forms import CreatePostForm
+from ..models import BlogPost
+from . import _EXTERNAL
+from . import _SCHEME
+
+bp = Blueprint("admin", __name__)
+
+
+# Admin check decorator function
+# This decorator will throw a 403 if the user is not authenticated
+# or if authenticated is not the admin user
+def admin_required(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.id != 1:
+            abort(403)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+@bp.route("/new-post", methods=["GET", "POST"])
+@admin_required
+def add_new_post():
+    form = CreatePostForm()
+    if form.validate_on_submit():
+        # Check if either save draft or publish button is pressed
+        # then set the is_draft flag appropriately in the DB
+        is_draft_value = True if form.save_draft.data else False
+        is_draft_value = False if form.publish.data else True
+        new_post = BlogPost(
+            title=form.title.data,
+            subtitle=form.subtitle.data,
+            body=form.body.data,
+            img_url=form.img_url.data,
+            # use the current logged in user_id as the author id
+            author_id=current_user.id,
+            date=date.today().strftime("%B %d, %Y"),
+            blog_title_str=form.title.data.replace(" ", "-").lower(),
+            is_draft=is_draft_value,
+        )
+        is_draft_value = ""
+        post_name = new_post.blog_title_str
+        db.session.add(new_post)
+        search_index.index_post(new_post)
+        db.session.commit()
+        page_cache.invalidate(post_name)
+        return redirect(
+            url_for("blog.get_all_posts", _external=_EXTERNAL, _scheme=_SCHEME)
+        )
+    return render_template("make-post.html", form=form)
+
+
+@bp.route("/edit-post/<string:post_name>", methods=["GET", "POST"])
+@admin_required
+def edit_post(post_name):
+    post = BlogPost.query.filter_by(blog_title_str=post_name).first()
+    edit_form = CreatePostForm(
+        title=post.title,
+        subtitle=post.subtitle,
+        img_url=post.img_url,
+        # author=post.author,
+        body=post.body,
+    )
+    if edit_form.validate_on_submit():
+        # Check if either save draft or publish button is pressed
+        # then set the is_draft flag appropriately in the DB
+        is_draft_value = True if edit_form.save_draft.data else False
+        is_draft_value = False if edit_form.publish.data else True
+        post.title = edit_form.title.data
+        post.subtitle = edit_form.subtitle.data
+        post.img_url = edit_form.img_url.data
+        post.author_id = current_user.id
+        post.body = edit_form.body.data
+        post.blog_title_str = edit_form.title.data.replace(" ", "-").lower()
+        post.is_draft = is_draft_value
+        search_index.index_post(post)
+        db.session.commit()
+        page_cache.invalidate(post_name, post.blog_title_str)
+        return redirect(
+            url_for(
+                "blog.show_post",
+                post_name=post.blog_title_str,
+                _external=_EXTERNAL,
+                _scheme=_SCHEME,
+            )
+        )
+
+    return render_template("make-post.html", form=edit_form)
+
+
+@bp.route("/delete/<int:post_id>")
+@admin_required
+def delete_post(post_id):
+    post_to_delete = BlogPost.query.get(post_id)
+    post_name = post_to_delete.blog_title_str
+    db.session.delete(post_to_delete)
+    search_index.remove_post(post_id)
+    db.session.commit()
+    page_cache.invalidate(post_name)
+    return redirect(url_for("blog.get_all_posts", _external=_EXTERNAL, _scheme=_SCHEME))
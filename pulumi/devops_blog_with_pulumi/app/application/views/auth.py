@@ -0,0 +1,192 @@
+"""Registration, login and the user loader of Flask-Login."""
+from flask import Blueprint
+from flask import current_app
+from flask import flash
+from flask import make_response
+from flask import redirect
+from flask import render_template
+from flask import session
+from flask import url_for
+from flask.globals import request
+from flask_login import login_user
+from flask_login import logout_user
+from sqlalchemy.orm import make_transient_to_detached
+
+from .. import db
+from .. import login_manager
+from .. import login_throttle
+from .. import password_hasher
+from ..cache import LRUBackend
+from ..forms import LoginUserForm
+from ..forms import RegisterForm
+from ..models import User
+from ..passwords import HashingBusy
+from ..sessions import cache_profile
+from ..sessions import cached_profile
+from . import _EXTERNAL
+from . import _SCHEME
+
+bp = Blueprint("auth", __name__)
+
+# Short lived cache of the users loaded by Flask-Login, keyed by user id
+user_cache = LRUBackend()
+
+
+@bp.record_once
+def configure_user_cache(state):
+    user_cache.max_entries = state.app.config.get("USER_CACHE_MAX_ENTRIES", 1024)
+
+
+# create login user loader, required by Flask
+@login_manager.user_loader
+def load_user(user):
+    # Profile kept in the server-side session, no query at all
+    columns = cached_profile(session, user)
+    ttl = current_app.config.get("USER_CACHE_TTL", 30)
+    if columns is None and ttl > 0:
+        columns = user_cache.get(user)
+    if columns is not None:
+        # Attach a copy of the cached user to the session without a query
+        cached_user = User(**columns)
+        make_transient_to_detached(cached_user)
+        cache_profile(session, cached_user)
+        return db.session.merge(cached_user, load=False)
+
+    loaded_user = db.session.get(User, int(user))
+    if loaded_user is not None:
+        cache_profile(session, loaded_user)
+    if loaded_user is not None and ttl > 0:
+        user_cache.set(
+            user,
+            {c.key: getattr(loaded_user, c.key) for c in User.__table__.columns},
+            ttl,
+        )
+    return loaded_user
+
+
+def _rejected(template, form, status, retry_after, message):
+    # Render the form again without doing any hash work
+    flash(message, category="danger")
+    response = make_response(render_template(template, form=form), status)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+@bp.route("/register", methods=["GET", "POST"])
+def register():
+    register_form = RegisterForm()
+
+    if register_form.validate_on_submit():
+        ip = login_throttle.client_ip()
+        retry_after = login_throttle.retry_after(ip)
+        if retry_after:
+            return _rejected(
+                "register.html",
+                register_form,
+                429,
+                retry_after,
+                "Too many attempts, please try again later",
+            )
+        login_throttle.failed(ip)
+
+        email = request.form.get("email")
+        name = request.form.get("name")
+
+        # Check if the email already exists in the DB
+        check_email_in_db = db.session.query(User).filter_by(email=email).first()
+        if check_email_in_db:
+            print("email exist in the DB")
+            flash("User/Email already exist", category="danger")
+            return redirect(url_for("auth.login"))
+        else:
+            try:
+                hashed_and_salted_password = password_hasher.hash(
+                    request.form.get("password")
+                )
+            except HashingBusy:
+                return _rejected(
+                    "register.html",
+                    register_form,
+                    503,
+                    1,
+                    "The server is busy, please try again",
+                )
+            new_user = User(email=email, name=name, password=hashed_and_salted_password)
+            db.session.add(new_user)
+            db.session.commit()
+            login_user(new_user)
+            flash(f"User: {new_user.name} registered succesfully!", category="success")
+            return redirect(url_for("auth.login", _external=_EXTERNAL, _scheme=_SCHEME))
+
+    return render_template("register.html", form=register_form)
+
+
+def _rehash(user, password):
+    # The hash was made with older parameters, replace it now that the
+    # password is known. Left for the next login when the pool is busy
+    try:
+        user.password = password_hasher.hash(password)
+    except HashingBusy:
+        return
+    db.session.commit()
+    user_cache.delete(str(user.id))
+
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    login_form = LoginUserForm()
+
+    if login_form.validate_on_submit():
+        ip = login_throttle.client_ip()
+        retry_after = login_throttle.retry_after(ip)
+        if retry_after:
+            return _rejected(
+                "login.html",
+                login_form,
+                429,
+                retry_after,
+                "Too many failed logins, please try again later",
+            )
+
+        email = request.form.get("email")
+        password = request.form.get("password")
+        user = db.session.query(User).filter_by(email=email).first()
+        if user:
+            try:
+                password_match = password_hasher.verify(user.password, password)
+            except HashingBusy:
+                return _rejected(
+                    "login.html",
+                    login_form,
+                    503,
+                    1,
+                    "The server is busy, please try again",
+                )
+            if password_match:
+                login_throttle.reset(ip)
+                if password_hasher.needs_rehash(user.password):
+                    _rehash(user, password)
+                login_user(user)
+                return redirect(
+                    url_for("blog.get_all_posts", _external=_EXTERNAL, _scheme=_SCHEME)
+                )
+            else:  # wrong username or password
+                login_throttle.failed(ip)
+                flash("Ivalid username or password", category="danger")
+                return redirect(
+                    url_for("auth.login", _external=_EXTERNAL, _scheme=_SCHEME)
+                )
+        else:  # user doesn'r exist in DB
+            login_throttle.failed(ip)
+            flash("User not found, please register", category="danger")
+            return redirect(
+                url_for("auth.register", _external=_EXTERNAL, _scheme=_SCHEME)
+            )
+
+    return render_template("login.html", form=login_form)
+
+
+@bp.route("/logout")
+def logout():
+    logout_user()
+    return redirect(url_for("blog.get_all_posts", _external=_EXTERNAL, _scheme=_SCHEME))
@@ -0,0 +1,334 @@
+"""Public pages of the blog: post listing, posts, likes and static pages."""
+from functools import partial
+
+from flask import abort
+from flask import Blueprint
+from flask import current_app
+from flask import flash
+from flask import jsonify
+from flask import make_response
+from flask import redirect
+from flask import render_template
+from flask import send_file
+from flask import url_for
+from flask.globals import request
+from flask_login import current_user
+
+from .. import db
+from .. import gravatar
+from .. import image_proxy
+from .. import page_cache
+from .. import post_counters
+from .. import search_index
+from ..assets import IMMUTABLE_CACHE_CONTROL
+from ..conditional import page_version
+from ..conditional import PageVersion
+from ..forms import CommentForm
+from ..images import image_version
+from ..models import BlogPost
+from ..models import Comment
+from ..queries import add_post_view
+from ..queries import load_comments_page
+from ..queries import load_post_page
+from ..queries import load_post_version
+from ..queries import load_posts_page
+from ..queries import load_posts_version
+from ..queries import load_search_results
+from ..routing import use_reader
+from ..streaming import stream_page
+from . import _EXTERNAL
+from . import _SCHEME
+
+bp = Blueprint("blog", __name__)
+
+
+@bp.app_template_filter("avatar")
+def avatar_url(avatar_hash: str) -> str:
+    """Build the gravatar link of an already hashed email, with the settings of
+    the gravatar extension.
+
+    Args:
+        avatar_hash (str): MD5 hash of the email, see User.avatar_hash.
+
+    Returns:
+        str: Gravatar link.
+    """
+    if gravatar.base_url is not None:
+        url = gravatar.base_url + "avatar/"
+    elif gravatar.use_ssl:
+        url = "https://secure.gravatar.com/avatar/"
+    else:
+        url = "http://www.gravatar.com/avatar/"
+    link = (
+        f"{url}{avatar_hash}?s={gravatar.size}&d={gravatar.default}&r={gravatar.rating}"
+    )
+    if gravatar.force_default:
+        link = link + "&f=y"
+    return link
+
+
+@bp.route("/")
+@use_reader
+def get_all_posts():
+    before = request.args.get("before", type=int)
+    after = request.args.get("after", type=int)
+    per_page = current_app.config.get("POSTS_PER_PAGE", 10)
+
+    # Check if the user is logged in to show his/her posts
+    # If not logged in don't show draft posts
+    if current_user.is_authenticated:
+        filters = {"author_id": current_user.id}
+    else:
+        filters = {"is_draft": False}
+        # Anonymous readers all get the same page, serve it from the cache
+        cache_key = page_cache.index_key(before, after)
+        cached = page_cache.get(cache_key)
+        if cached is not None and "version" in cached:
+            version = PageVersion.from_dict(cached["version"])
+            return version.not_modified() or version.apply(cached["body"])
+
+    # Answer the clients having the page already before loading it
+    posts = load_posts_version(**filters)
+    version = page_version(
+        "index",
+        before,
+        after,
+        posts.post_count,
+        posts.updated_at,
+        user_id=current_user.get_id(),
+    )
+    not_modified = version.not_modified()
+    if not_modified is not None:
+        return not_modified
+
+    page = load_posts_page(BlogPost.query.filter_by(**filters), before, after, per_page)
+    body = render_template("index.html", all_posts=page.posts, page=page)
+    if not current_user.is_authenticated:
+        page_cache.set(cache_key, {"body": body, "version": version.as_dict()})
+    return version.apply(body)
+
+
+@bp.route("/post/<string:post_name>", methods=["GET", "POST"])
+@use_reader
+def show_post(post_name):
+    # Anonymous readers get the cached page, only the view is recorded
+    cacheable = page_cache.cacheable()
+    if cacheable:
+        cached = page_cache.get(page_cache.post_key(post_name))
+        if cached is not None and "version" in cached:
+            post_counters.incr(cached["post_id"], "post_views")
+            version = PageVersion.from_dict(cached["version"])
+            return version.not_modified() or version.apply(cached["body"])
+
+    # Answer the clients having the page already before loading the post and
+    # its comments, drafts are only versioned for their author
+    version = None
+    current = (
+        load_post_version(post_name) if request.method in ("GET", "HEAD") else None
+    )
+    if current is not None and (
+        not current.is_draft or current_user.get_id() == str(current.author_id)
+    ):
+        version = page_version(
+            "post",
+            current.id,
+            current.updated_at,
+            current.comment_count,
+            current.comment_updated_at,
+            user_id=current_user.get_id(),
+        )
+        not_modified = version.not_modified()
+        if not_modified is not None:
+            if not current.is_draft:
+                post_counters.incr(current.id, "post_views")
+            return not_modified
+
+    comment_form = CommentForm()
+    try:
+        get_post = load_post_page(post_name)
+
+        if get_post.is_draft:
+            if not current_user.is_authenticated:
+                abort(404)
+            elif current_user.id != get_post.author_id:
+                abort(404)
+            requested_post = get_post
+        else:
+            requested_post = get_post
+            # A comment is followed by a GET of the page, which counts the view
+            if not comment_form.is_submitted():
+                add_post_view(requested_post)
+
+        # Check if user is authenticated to setup the gravatar
+        # if not use a sample email to show a default gravatar
+        if current_user.is_authenticated:
+            hashed_user_email = current_user.avatar_hash
+
+        else:
+            hashed_user_email = "sample@email.com"
+
+        if comment_form.is_submitted():
+            if current_user.is_authenticated:
+                new_comment = Comment(
+                    comment=comment_form.body.data,
+                    blog_post_id=requested_post.id,
+                    author_id=current_user.id,
+                )
+                db.session.add(new_comment)
+                db.session.commit()
+                page_cache.invalidate(post_name, index=False)
+                # Back to the page with a GET, which loads the comments once
+                # and does not post the comment again on reload
+                return redirect(
+                    url_for(
+                        "blog.show_post",
+                        post_name=post_name,
+                        _external=_EXTERNAL,
+                        _scheme=_SCHEME,
+                    )
+                )
+            else:
+                flash("You need to login or register to comment", category="danger")
+                return redirect(
+                    url_for("auth.login", _external=_EXTERNAL, _scheme=_SCHEME)
+                )
+
+        context = dict(
+            post=requested_post,
+            form=comment_form,
+            # Queried by the template once the post itself was rendered
+            comments_page=partial(
+                load_comments_page,
+                requested_post.id,
+                per_page=current_app.config.get("COMMENTS_PER_PAGE", 20),
+            ),
+            email=hashed_user_email,
+        )
+
+        def cache_page(body):
+            page_cache.set(
+                page_cache.post_key(post_name),
+                {
+                    "body": body,
+                    "post_id": requested_post.id,
+                    "version": version.as_dict(),
+                },
+            )
+
+        cache = version is not None and cacheable and not requested_post.is_draft
+        if current_app.config.get("POST_STREAMING", False):
+            # The head and the post are sent before the comments are loaded
+            response = stream_page(
+                "post.html", cache_page if cache else None, **context
+            )
+            return response if version is None else version.apply(response)
+
+        body = render_template("post.html", **context)
+        if version is None:
+            return body
+        if cache:
+            cache_page(body)
+        return version.apply(body)
+    except:
+        abort(404)
+
+
+@bp.route("/post/<string:post_name>/comments")
+@use_reader
+def post_comments(post_name):
+    """Next page of the comments of a post as JSON, for "Load more comments"."""
+    post = (
+        db.session.query(BlogPost.id, BlogPost.is_draft, BlogPost.author_id)
+        .filter_by(blog_title_str=post_name)
+        .first()
+    )
+    if post is None or (post.is_draft and current_user.get_id() != str(post.author_id)):
+        abort(404)
+
+    page = load_comments_page(
+        post.id,
+        after=request.args.get("after", type=int),
+        per_page=current_app.config.get("COMMENTS_PER_PAGE", 20),
+    )
+    return jsonify(
+        comments=[
+            {
+                "id": comment.id,
+                # Same HTML as rendered by post.html
+                "comment": comment.comment,
+                "author": comment.comment_author.name,
+                "avatar": avatar_url(comment.comment_author.avatar_hash),
+            }
+            for comment in page.comments
+        ],
+        next=page.next,
+    )
+
+
+@bp.route("/img/<int:post_id>/<int:width>")
+@use_reader
+def post_image(post_id, width):
+    """Header image of a post resized to one of IMAGE_WIDTHS, see images.py."""
+    if width not in image_proxy.widths:
+        abort(404)
+    post = (
+        db.session.query(BlogPost.img_url, BlogPost.is_draft, BlogPost.author_id)
+        .filter_by(id=post_id)
+        .first()
+    )
+    if post is None or (post.is_draft and current_user.get_id() != str(post.author_id)):
+        abort(404)
+
+    path = image_proxy.thumbnail(post.img_url, width)
+    if path is None:
+        # Not resized (yet), the browser gets the original
+        return redirect(post.img_url)
+    response = send_file(path, mimetype="image/jpeg", conditional=True)
+    if request.args.get("v") == image_version(post.img_url):
+        # The link changes with the image
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = 3600
+    return response
+
+
+@bp.route("/search")
+@use_reader
+def search():
+    query = request.args.get("q", "").strip()
+    results = search_index.search(
+        query, limit=current_app.config.get("SEARCH_RESULTS_LIMIT", 20)
+    )
+    return render_template(
+        "search.html", query=query, all_posts=load_search_results(results)
+    )
+
+
+@bp.route("/about")
+@use_reader
+def about():
+    return render_template("about.html")
+
+
+@bp.route("/contact")
+def contact():
+    return render_template("contact.html")
+
+
+@bp.route("/like-post/<string:post_name>", methods=["GET", "POST"])
+def like_post(post_name):
+    # Only the id and the persisted likes are needed to echo the new count
+    post = (
+        db.session.query(BlogPost.id, BlogPost.post_likes)
+        .filter_by(blog_title_str=post_name)
+        .first()
+    )
+    if post is None:
+        abort(404)
+
+    # Add 1 to the likes of the post, it is saved back to the DB in batches
+    post_counters.incr(post.id, "post_likes")
+    response = make_response(str(post_counters.get(post, "post_likes")), 200)
+    response.mimetype = "text/plain"
+    return response
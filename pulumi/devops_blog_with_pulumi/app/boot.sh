@@ -1,12 +1,35 @@
 #!/bin/bash
 source venv/bin/activate
-while true; do
-    flask db upgrade
-    if [[ "$?" == "0" ]]; then
-        break
-    fi
-    echo Upgrade command failed, retrying in 5 secs...
-    sleep 5
-done
+# Used by gunicorn.conf.py to report how long the container took to serve
+export BOOT_STARTED_AT=$(date +%s.%N)
 
-exec gunicorn -b :5000 --access-logfile - --error-logfile - wsgi:app
+# MIGRATION_MODE:
+#   wait    - wait for the migration job to bring the schema to the head
+#             revision, the app containers don't migrate (Kubernetes)
+#   upgrade - migrate from this container, serialized by a DB lock
+#   skip    - start right away
+case "${MIGRATION_MODE:-upgrade}" in
+    wait)
+        flask schema wait --timeout "${MIGRATION_WAIT_TIMEOUT:-300}" || exit 1
+        ;;
+    upgrade)
+        while true; do
+            flask schema upgrade
+            if [[ "$?" == "0" ]]; then
+                break
+            fi
+            echo Upgrade command failed, retrying in 5 secs...
+            sleep 5
+        done
+        ;;
+    skip)
+        ;;
+    *)
+        echo "Unknown MIGRATION_MODE ${MIGRATION_MODE}, expected wait, upgrade or skip" >&2
+        exit 1
+        ;;
+esac
+
+# Workers, worker class and threads are set with GUNICORN_* env vars,
+# see gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py wsgi:app
@@ -11,6 +11,8 @@ db_user = environ.get("DB_USERNAME")
 db_password = environ.get("DB_PASSWORD")
 db_hostname = environ.get("DB_HOSTNAME")
 db_name = environ.get("DB_NAME")
+# Aurora reader endpoint, reads of the read only views are sent there when set
+db_reader_hostname = environ.get("DB_READER_HOSTNAME")
 db_port = 3306
 
 # if environ.get("ON_CLOUD"):
@@ -29,6 +31,69 @@ db_port = 3306
 # Construct the db conenction string to be used by flask-migrate
 db_uri = f"mysql+pymysql://{db_user}:{db_password}@{db_hostname}/{db_name}"
 # print(f"DB_URI: {db_uri}")
+reader_db_uri = (
+    f"mysql+pymysql://{db_user}:{db_password}@{db_reader_hostname}/{db_name}"
+    if db_reader_hostname
+    else None
+)
+
+
+def engine_options(database_uri: str, pool_size: int, max_overflow: int) -> dict:
+    """Build the SQLAlchemy engine options for a database.
+
+    The defaults can be overridden with the DB_POOL_* and DB_*_TIMEOUT env vars.
+    Keep workers * pods * (pool_size + max_overflow) under the Aurora
+    max_connections of the instance class.
+
+    Args:
+        database_uri (str): The database connection string.
+        pool_size (int): Default number of connections kept open per worker.
+        max_overflow (int): Default number of extra connections under load.
+
+    Returns:
+        dict: Options for SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    if not database_uri.startswith("mysql"):
+        # SQLite (development and CI) keeps the Flask-SQLAlchemy defaults
+        return {}
+
+    return {
+        "pool_size": int(environ.get("DB_POOL_SIZE", pool_size)),
+        "max_overflow": int(environ.get("DB_MAX_OVERFLOW", max_overflow)),
+        # Seconds to wait for a free connection before failing the request
+        "pool_timeout": float(environ.get("DB_POOL_TIMEOUT", 10)),
+        # Replace connections before Aurora or the NAT drop them as idle
+        "pool_recycle": int(environ.get("DB_POOL_RECYCLE", 1800)),
+        # Test connections on checkout so the ones left behind by a
+        # failover are replaced instead of failing the request
+        "pool_pre_ping": environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+        "connect_args": {
+            "connect_timeout": int(environ.get("DB_CONNECT_TIMEOUT", 5)),
+            "read_timeout": int(environ.get("DB_READ_TIMEOUT", 30)),
+            "write_timeout": int(environ.get("DB_WRITE_TIMEOUT", 30)),
+        },
+    }
+
+
+def reader_binds(reader_uri: str, pool_size: int, max_overflow: int) -> dict:
+    """Build the SQLALCHEMY_BINDS with the "reader" bind, if there is a reader.
+
+    Args:
+        reader_uri (str): The reader connection string, or None.
+        pool_size (int): Default number of connections kept open per worker.
+        max_overflow (int): Default number of extra connections under load.
+
+    Returns:
+        dict: Binds for SQLALCHEMY_BINDS.
+    """
+    if not reader_uri:
+        return {}
+    return {
+        "reader": {
+            "url": reader_uri,
+            **engine_options(reader_uri, pool_size, max_overflow),
+        }
+    }
 
 
 class Config:
@@ -40,6 +105,83 @@ class Config:
     TEMPLATES_FOLDER = "templates"
     SQLALCHEMY_TRACK_MODIFICATIONS = "FALSE"
     CKEDITOR_PKG_TYPE = "standard"
+    # "full" or "reader", reader workers only serve the public pages and login
+    APP_MODE = environ.get("APP_MODE", "full")
+    # Log how long each step of the app startup took
+    STARTUP_PROFILE = environ.get("STARTUP_PROFILE", "false").lower() == "true"
+    # Serve the static files built by application/assets.py under hashed names
+    STATIC_ASSETS_ENABLED = (
+        environ.get("STATIC_ASSETS_ENABLED", "true").lower() == "true"
+    )
+    # Resized post header images, see application/images.py
+    IMAGE_WIDTHS = tuple(
+        int(width) for width in environ.get("IMAGE_WIDTHS", "480,960,1600").split(",")
+    )
+    IMAGE_CACHE_DIR = environ.get("IMAGE_CACHE_DIR", "/tmp/blog-images")
+    IMAGE_CACHE_MAX_BYTES = int(environ.get("IMAGE_CACHE_MAX_BYTES", 256 * 1024**2))
+    IMAGE_FETCH_TIMEOUT = float(environ.get("IMAGE_FETCH_TIMEOUT", 5))
+    # Threads per worker fetching and resizing the images missing from the cache
+    IMAGE_RESIZE_WORKERS = int(environ.get("IMAGE_RESIZE_WORKERS", 1))
+    # Number of posts per page of the home page listing
+    POSTS_PER_PAGE = int(environ.get("POSTS_PER_PAGE", 10))
+    # Number of comments per page of a post, the next ones are loaded as JSON
+    COMMENTS_PER_PAGE = int(environ.get("COMMENTS_PER_PAGE", 20))
+    # Stream the post pages, the head and the post are sent before the comments
+    POST_STREAMING = environ.get("POST_STREAMING", "false").lower() == "true"
+    # Characters of a streamed page buffered before being sent
+    STREAM_CHUNK_SIZE = int(environ.get("STREAM_CHUNK_SIZE", 8192))
+    # Seconds between writes of the buffered post view/like counters
+    POST_COUNTER_FLUSH_INTERVAL = float(environ.get("POST_COUNTER_FLUSH_INTERVAL", 5))
+    # Rendered page cache for anonymous readers: lru, redis or null
+    # The redis backend needs the redis package and PAGE_CACHE_REDIS_URL
+    PAGE_CACHE_TYPE = environ.get("PAGE_CACHE_TYPE", "lru")
+    PAGE_CACHE_REDIS_URL = environ.get(
+        "PAGE_CACHE_REDIS_URL", "redis://localhost:6379/0"
+    )
+    PAGE_CACHE_TTL = int(environ.get("PAGE_CACHE_TTL", 60))
+    PAGE_CACHE_MAX_ENTRIES = int(environ.get("PAGE_CACHE_MAX_ENTRIES", 512))
+    # Maximum number of results of /search
+    SEARCH_RESULTS_LIMIT = int(environ.get("SEARCH_RESULTS_LIMIT", 20))
+    # Seconds the number of indexed posts and their average length are reused
+    SEARCH_STATS_TTL = int(environ.get("SEARCH_STATS_TTL", 60))
+    # Seconds a user loaded by Flask-Login is reused before reading it again
+    USER_CACHE_TTL = int(environ.get("USER_CACHE_TTL", 30))
+    USER_CACHE_MAX_ENTRIES = int(environ.get("USER_CACHE_MAX_ENTRIES", 1024))
+    # Where the sessions are kept: cookie (signed cookie), redis or db
+    # With redis or db the cookie only holds the session id, and the profile
+    # of the logged in user is read from the session instead of the DB
+    SESSION_BACKEND = environ.get("SESSION_BACKEND", "cookie")
+    SESSION_REDIS_URL = environ.get("SESSION_REDIS_URL", "redis://localhost:6379/1")
+    # Seconds a session is kept without being used
+    SESSION_TTL = int(environ.get("SESSION_TTL", 86400))
+    # werkzeug method and salt length of new password hashes, the hashes made
+    # with other ones are replaced on the next login
+    PASSWORD_HASH_METHOD = environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+    PASSWORD_SALT_LENGTH = int(environ.get("PASSWORD_SALT_LENGTH", 16))
+    # Threads hashing passwords per worker, and hashes allowed to wait for them
+    PASSWORD_HASH_WORKERS = int(environ.get("PASSWORD_HASH_WORKERS", 1))
+    PASSWORD_HASH_QUEUE = int(environ.get("PASSWORD_HASH_QUEUE", 8))
+    # Failed logins and registrations allowed per client IP and window (seconds)
+    LOGIN_THROTTLE_MAX_ATTEMPTS = int(environ.get("LOGIN_THROTTLE_MAX_ATTEMPTS", 10))
+    LOGIN_THROTTLE_WINDOW = int(environ.get("LOGIN_THROTTLE_WINDOW", 300))
+    # Proxies adding to X-Forwarded-For in front of the app (the ALB)
+    TRUSTED_PROXIES = int(environ.get("TRUSTED_PROXIES", 1))
+    # Serve the connection pool numbers on /pool-metrics, off by default as the
+    # route is public
+    POOL_METRICS_ENABLED = (
+        environ.get("POOL_METRICS_ENABLED", "false").lower() == "true"
+    )
+    # Serve request latency, SQL and template metrics on /metrics for Prometheus
+    METRICS_ENABLED = environ.get("METRICS_ENABLED", "false").lower() == "true"
+    # Requests slower than this are logged with their SQL statements
+    METRICS_SLOW_REQUEST_SECONDS = float(
+        environ.get("METRICS_SLOW_REQUEST_SECONDS", 1.0)
+    )
+    # Directory the workers write their metrics to, summed by /metrics. Set
+    # by gunicorn.conf.py, unset the numbers are those of the process only
+    METRICS_MULTIPROC_DIR = environ.get("METRICS_MULTIPROC_DIR")
+    # Seconds a client that just wrote keeps reading from the writer
+    DB_READER_STICKY_SECONDS = int(environ.get("DB_READER_STICKY_SECONDS", 10))
 
 
 class ProdConfig(Config):
@@ -47,6 +189,14 @@ class ProdConfig(Config):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = environ.get("PROD_DATABASE_URI", db_uri)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=10, max_overflow=10
+    )
+    SQLALCHEMY_BINDS = reader_binds(
+        environ.get("PROD_READER_DATABASE_URI", reader_db_uri),
+        pool_size=10,
+        max_overflow=10,
+    )
     # SQLALCHEMY_DATABASE_URI = db_uri
 
 
@@ -56,6 +206,9 @@ class DevConfig(Config):
     TESTING = True
     # SQLALCHEMY_DATABASE_URI = db_uri
     SQLALCHEMY_DATABASE_URI = "sqlite:///blog.db"
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=2, max_overflow=2
+    )
 
 
 class TestConfig(Config):
@@ -63,4 +216,18 @@ class TestConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = environ.get("TEST_DATABASE_URI", db_uri)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=5, max_overflow=5
+    )
+    SQLALCHEMY_BINDS = reader_binds(
+        environ.get("TEST_READER_DATABASE_URI", reader_db_uri),
+        pool_size=5,
+        max_overflow=5,
+    )
+    # Counters are flushed explicitly by the tests
+    POST_COUNTER_FLUSH_INTERVAL = 0
+    PAGE_CACHE_TYPE = "null"
+    # Cheap hashes, the tests log in many times
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    POOL_METRICS_ENABLED = True
     # SQLALCHEMY_DATABASE_URI = db_uri
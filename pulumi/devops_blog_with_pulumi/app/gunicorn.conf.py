@@ -0,0 +1,76 @@
+"""Gunicorn configuration.
+
+Everything can be set through env vars from the Kubernetes deployment:
+
+* GUNICORN_WORKER_CLASS: ``sync`` (default), ``gthread`` or ``gevent``.
+  With ``gevent`` the standard library is monkey patched in every worker,
+  which makes PyMySQL (pure Python) cooperative, so a worker keeps serving
+  other requests while one waits on Aurora.
+* GUNICORN_WORKERS: worker processes, defaults to 2. Not derived from the
+  CPU count, inside a pod that is the CPU count of the node.
+* GUNICORN_THREADS: threads per worker for ``gthread``.
+* GUNICORN_WORKER_CONNECTIONS: concurrent requests per ``gevent`` worker.
+* GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT / GUNICORN_KEEPALIVE: seconds.
+
+With METRICS_ENABLED, the workers write their request metrics to
+METRICS_MULTIPROC_DIR (a fresh temporary directory unless set) and /metrics
+serves the sum of all of them, see application/metrics.py.
+
+Size DB_POOL_SIZE + DB_MAX_OVERFLOW for the concurrency of one worker
+(threads or worker connections), requests beyond the pool wait for a
+connection up to DB_POOL_TIMEOUT.
+"""
+import glob
+import os
+import tempfile
+import time
+from os import environ
+
+bind = environ.get("GUNICORN_BIND", ":5000")
+accesslog = "-"
+errorlog = "-"
+
+worker_class = environ.get("GUNICORN_WORKER_CLASS", "sync")
+workers = int(environ.get("GUNICORN_WORKERS", 2))
+threads = int(environ.get("GUNICORN_THREADS", 1))
+worker_connections = int(environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+timeout = int(environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# Keep connections from the ALB open, its idle timeout is 60 seconds
+keepalive = int(environ.get("GUNICORN_KEEPALIVE", 65))
+
+
+def on_starting(server):
+    """Give the workers an empty directory for their request metrics."""
+    if environ.get("METRICS_ENABLED", "false").lower() != "true":
+        return
+    directory = environ.get("METRICS_MULTIPROC_DIR")
+    if directory:
+        # Files of the workers of a previous run would be summed with the new ones
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            os.remove(path)
+    else:
+        # Inherited by the workers, forked after this hook
+        environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="blog-metrics-")
+
+
+def when_ready(server):
+    """Log how long the container took from boot.sh to accepting requests."""
+    started_at = environ.get("BOOT_STARTED_AT")
+    if started_at:
+        server.log.info(
+            "Ready to serve %.2fs after container start",
+            time.time() - float(started_at),
+        )
+
+
+def worker_exit(server, worker):
+    """Write back the buffered post counters and the request metrics before
+    the worker goes away."""
+    from application import post_counters
+    from application import request_metrics
+
+    post_counters.shutdown()
+    request_metrics.dump()
@@ -0,0 +1,51 @@
+"""Read heavy load profile of the blog, mostly anonymous readers.
+
+Compare the worker classes by running the same profile against each of them:
+
+    GUNICORN_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py wsgi:app
+    locust -f loadtest/locustfile.py --headless -u 200 -r 20 -t 2m \\
+        --host http://localhost:5000 --csv results/sync
+
+    GUNICORN_WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py wsgi:app
+    locust -f loadtest/locustfile.py --headless -u 200 -r 20 -t 2m \\
+        --host http://localhost:5000 --csv results/gevent
+
+and comparing the requests/s and percentiles of results/*_stats.csv.
+Locust is not an app dependency: pip install locust
+"""
+import random
+import re
+
+from locust import between
+from locust import HttpUser
+from locust import task
+
+POST_LINK = re.compile(r'href="/post/([^"]+)"')
+
+
+class Reader(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        response = self.client.get("/", name="/")
+        self.post_names = POST_LINK.findall(response.text)
+
+    @task(10)
+    def index(self):
+        self.client.get("/", name="/")
+
+    @task(8)
+    def post(self):
+        if self.post_names:
+            post_name = random.choice(self.post_names)
+            self.client.get(f"/post/{post_name}", name="/post/[post_name]")
+
+    @task(1)
+    def like(self):
+        if self.post_names:
+            post_name = random.choice(self.post_names)
+            self.client.post(f"/like-post/{post_name}", name="/like-post/[post_name]")
+
+    @task(1)
+    def about(self):
+        self.client.get("/about", name="/about")
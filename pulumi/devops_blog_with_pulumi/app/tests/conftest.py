@@ -1,11 +1,14 @@
+from contextlib import contextmanager
 from datetime import date
 
 import pytest
 from _pytest import config
 from flask import app
+from flask import g
 
 from app.application import db
 from app.application import init_app
+from app.application import post_counters
 from app.application.models import BlogPost
 from app.application.models import Comment
 from app.application.models import User
@@ -36,10 +39,57 @@ def test_client():
             db.session.commit()
 
             yield testing_client  # this is where the testing happens!\
+            post_counters.flush()
             db.session.remove()
             db.drop_all()
 
 
+@pytest.fixture()
+def as_admin(test_client):
+    """Log the test client in as the admin user (id 1) for a block of requests."""
+
+    @contextmanager
+    def admin():
+        with test_client.session_transaction() as session:
+            session["_user_id"] = "1"
+            session["_fresh"] = True
+        # The app context outlives the requests, drop the user Flask-Login
+        # kept in g so the next request loads it from the session
+        g.pop("_login_user", None)
+        try:
+            yield test_client
+        finally:
+            test_client.get("/logout")
+            g.pop("_login_user", None)
+
+    return admin
+
+
+@pytest.fixture()
+def make_post(test_client):
+    """Build a published post of the admin user, any field can be overridden.
+
+    The fields not given are derived from the title, e.g. the slug
+    ``counter-post`` and the body ``Counter Post body.`` for "Counter Post".
+    """
+
+    def make(title="Test Post", **overrides):
+        slug = title.lower().replace(" ", "-")
+        fields = dict(
+            title=title,
+            subtitle=f"A post titled {title}",
+            body=f"{title} body.",
+            img_url=f"https://example.com/{slug}.jpg",
+            date="April 15, 2024",
+            blog_title_str=slug,
+            author_id=1,
+        )
+        fields.update(overrides)
+        return BlogPost(**fields)
+
+    return make
+
+
 @pytest.fixture(scope="module")
 def new_user():
     user = User(
@@ -0,0 +1,59 @@
+""" This file contains tests for the fingerprinted static assets"""
+import gzip
+
+from flask import Flask
+from flask import url_for
+
+from app.application.assets import build
+from app.application.assets import IMMUTABLE_CACHE_CONTROL
+from app.application.assets import StaticAssets
+
+
+def test_hashed_assets_served_precompressed(tmp_path):
+    """
+    GIVEN a static folder with a stylesheet referencing a font
+    WHEN the assets are built and the stylesheet is requested
+    THEN check url_for returns the hashed name, the font reference is hashed too
+    and the gzip variant is served with an immutable cache header
+    """
+    (tmp_path / "css").mkdir()
+    (tmp_path / "fonts").mkdir()
+    (tmp_path / "fonts" / "icons.woff2").write_bytes(b"\x00font")
+    (tmp_path / "css" / "site.css").write_text(
+        "body { color: #333; }\n" * 100
+        + "@font-face { src: url('../fonts/icons.woff2?v=1'); }\n"
+    )
+    manifest = build(str(tmp_path))
+    assert manifest["css/site.css"].startswith("dist/css/site.")
+    css = (tmp_path / manifest["css/site.css"]).read_text()
+    font = manifest["fonts/icons.woff2"].replace("dist/fonts/", "")
+    assert f"url('../fonts/{font}?v=1')" in css
+
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    StaticAssets(app)
+    with app.test_request_context():
+        assert url_for("static", filename="css/site.css").endswith(
+            manifest["css/site.css"]
+        )
+    client = app.test_client()
+
+    response = client.get(
+        "/static/" + manifest["css/site.css"], headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.mimetype == "text/css"
+    assert gzip.decompress(response.data).decode() == css
+    response.close()
+
+    response = client.get("/static/" + manifest["css/site.css"])
+    assert "Content-Encoding" not in response.headers
+    assert response.data.decode() == css
+    response.close()
+
+    # The original names are still served, without the long cache
+    response = client.get("/static/css/site.css")
+    assert response.status_code == 200
+    assert response.headers.get("Cache-Control") != IMMUTABLE_CACHE_CONTROL
+    response.close()
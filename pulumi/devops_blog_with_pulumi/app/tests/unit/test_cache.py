@@ -0,0 +1,57 @@
+""" This file contains tests for the rendered page cache"""
+import pytest
+
+from app.application import db
+from app.application import page_cache
+from app.application.cache import LRUBackend
+
+
+@pytest.fixture()
+def lru_page_cache():
+    backend = page_cache.backend
+    page_cache.backend = LRUBackend(max_entries=8)
+    yield page_cache
+    page_cache.backend = backend
+
+
+def test_lru_backend_eviction_and_expiry():
+    """
+    GIVEN an LRU backend with room for two entries
+    WHEN a third entry is added and an entry expires
+    THEN check the least recently used and the expired entries are gone
+    """
+    backend = LRUBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1  # "b" is now the least recently used
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    backend.set("d", 4, ttl=-1)
+    assert backend.get("d") is None
+
+
+def test_index_page_cached_until_post_deleted(
+    test_client, lru_page_cache, as_admin, make_post
+):
+    """
+    GIVEN a published post and the LRU page cache
+    WHEN the index page is requested, the post is renamed directly in the DB,
+    and then the post is deleted through the app
+    THEN check the cached page is served until the delete invalidates it
+    """
+    post = make_post("Cached Post")
+    db.session.add(post)
+    db.session.commit()
+
+    assert b"Cached Post" in test_client.get("/").data
+    post.subtitle = "Changed behind the cache"
+    db.session.commit()
+    assert b"Changed behind the cache" not in test_client.get("/").data
+    assert test_client.get("/post/cached-post").status_code == 200
+    assert lru_page_cache.get(lru_page_cache.post_key("cached-post")) is not None
+
+    with as_admin():
+        assert test_client.get(f"/delete/{post.id}").status_code == 302
+    assert lru_page_cache.get(lru_page_cache.post_key("cached-post")) is None
+    assert b"Cached Post" not in test_client.get("/").data
@@ -0,0 +1,81 @@
+""" This file contains tests for the conditional requests of the pages"""
+from flask import template_rendered
+
+from app.application import db
+from app.application import post_counters
+from app.application.models import Comment
+
+
+def test_post_page_not_modified(test_client, make_post):
+    """
+    GIVEN a published post whose page was already fetched
+    WHEN it is fetched again with its ETag, before and after the views are
+    flushed and after a comment is added
+    THEN check a 304 is returned without rendering until the comment changes it
+    """
+    post = make_post("Conditional Post")
+    db.session.add(post)
+    db.session.commit()
+
+    response = test_client.get("/post/conditional-post")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "Last-Modified" not in response.headers
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    rendered = []
+
+    def record(sender, template, context, **extra):
+        rendered.append(template.name)
+
+    template_rendered.connect(record)
+    try:
+        post_counters.flush()
+        response = test_client.get(
+            "/post/conditional-post", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert rendered == []
+    finally:
+        template_rendered.disconnect(record)
+
+    db.session.add(Comment(comment="First!", blog_post_id=post.id, author_id=2))
+    db.session.commit()
+    response = test_client.get(
+        "/post/conditional-post", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert b"First!" in response.data
+    post_counters.flush()
+
+
+def test_index_page_not_modified_only_by_etag(test_client, as_admin, make_post):
+    """
+    GIVEN the home page already fetched
+    WHEN its newest post is deleted and it is fetched again with its ETag or
+    with an If-Modified-Since of the first fetch
+    THEN check neither gets a 304, the page shows one post less
+    """
+    older = make_post("Older Listed Post")
+    newer = make_post("Newer Listed Post")
+    db.session.add_all([older, newer])
+    db.session.commit()
+    response = test_client.get("/")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert test_client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+    with as_admin() as client:
+        client.get(f"/delete/{newer.id}")
+    response = test_client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert b"Newer Listed Post" not in response.data
+    response = test_client.get(
+        "/", headers={"If-Modified-Since": "Sun, 18 Oct 2099 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+
+    with as_admin() as client:
+        client.get(f"/delete/{older.id}")
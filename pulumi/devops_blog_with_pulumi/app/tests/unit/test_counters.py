@@ -0,0 +1,56 @@
+""" This file contains tests for the buffered post counters"""
+from app.application import db
+from app.application import post_counters
+from app.application.models import BlogPost
+
+
+def test_like_post_is_buffered_and_flushed(test_client, make_post):
+    """
+    GIVEN a published post
+    WHEN the post is liked twice
+    THEN check the new count is echoed before and persisted after the flush
+    """
+    post = make_post("Counter Post", post_views=0, post_likes=3)
+    db.session.add(post)
+    db.session.commit()
+
+    assert test_client.post("/like-post/counter-post").data == b"4"
+    assert test_client.post("/like-post/counter-post").data == b"5"
+    # Nothing has been written back yet
+    db.session.expire_all()
+    assert db.session.get(BlogPost, post.id).post_likes == 3
+
+    assert post_counters.flush() == 1
+    db.session.expire_all()
+    flushed = db.session.get(BlogPost, post.id)
+    assert flushed.post_likes == 5
+    assert post_counters.get(flushed, "post_likes") == 5
+
+
+def test_post_views_are_merged_with_pending(test_client, make_post):
+    """
+    GIVEN a published post
+    WHEN the post page is requested
+    THEN check the view is buffered and shown on the page
+    """
+    post = make_post("Viewed Post")
+    db.session.add(post)
+    db.session.commit()
+
+    test_client.get("/post/viewed-post")
+    response = test_client.get("/post/viewed-post")
+    assert b"<label>2</label>" in response.data
+    assert post_counters.get(post, "post_views") == 2
+
+    post_counters.flush()
+    db.session.expire_all()
+    assert db.session.get(BlogPost, post.id).post_views == 2
+
+
+def test_like_unknown_post(test_client):
+    """
+    GIVEN a Flask application configured for testing
+    WHEN a post that doesn't exist is liked
+    THEN check a 404 is returned
+    """
+    assert test_client.post("/like-post/no-such-post").status_code == 404
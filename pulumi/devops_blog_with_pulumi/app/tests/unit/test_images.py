@@ -0,0 +1,120 @@
+""" This file contains tests for the resized post header images"""
+import os
+from io import BytesIO
+
+import pytest
+
+from app.application import db
+from app.application import image_proxy
+from app.application import post_counters
+from app.application.assets import IMMUTABLE_CACHE_CONTROL
+from app.application.images import DiskLRU
+from app.application.images import image_version
+
+
+@pytest.fixture()
+def image_post(test_client, tmp_path, monkeypatch, make_post):
+    monkeypatch.setattr(image_proxy, "cache", DiskLRU(str(tmp_path), 1024**2))
+    post = make_post("Image Post", img_url="https://images.example.com/photo.jpg")
+    db.session.add(post)
+    db.session.commit()
+    yield post
+    post_counters.flush()
+    db.session.delete(post)
+    db.session.commit()
+
+
+def test_disk_lru_evicts_least_recently_used(tmp_path):
+    """
+    GIVEN a disk cache with room for two files
+    WHEN a third file is stored after the first one was read
+    THEN check the file used the longest time ago is removed
+    """
+    cache = DiskLRU(str(tmp_path), max_bytes=20)
+    cache.put("a.jpg", b"a" * 10)
+    cache.put("b.jpg", b"b" * 10)
+    os.utime(cache.path("a.jpg"), (1, 1))
+    os.utime(cache.path("b.jpg"), (2, 2))
+    assert cache.get("a.jpg") is not None  # "b" is now the least recently used
+    cache.put("c.jpg", b"c" * 10)
+    assert cache.get("b.jpg") is None
+    assert cache.get("a.jpg") is not None
+    assert cache.get("c.jpg") is not None
+
+
+def test_cached_image_served_immutable(test_client, image_post):
+    """
+    GIVEN a post whose header image is in the cache
+    WHEN the post page and its image link are requested
+    THEN check the page links to every width of the image, served as immutable
+    """
+    width = image_proxy.widths[-1]
+    image_proxy.cache.put(image_proxy.key(image_post.img_url, width), b"\xff\xd8jpeg")
+    version = image_version(image_post.img_url)
+    page = test_client.get("/post/image-post").data
+    for size in image_proxy.widths:
+        assert f"/img/{image_post.id}/{size}?v={version}".encode() in page
+    link = f"/img/{image_post.id}/{width}?v={version}"
+
+    response = test_client.get(link)
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    assert response.data == b"\xff\xd8jpeg"
+    assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    response.close()
+    assert test_client.get(f"/img/{image_post.id}/123").status_code == 404
+
+
+def test_image_falls_back_to_original(test_client, image_post, monkeypatch):
+    """
+    GIVEN a post whose header image cannot be resized
+    WHEN its image link is requested
+    THEN check the client is redirected to the original image
+    """
+    monkeypatch.setattr(image_proxy, "enabled", False)
+    response = test_client.get(f"/img/{image_post.id}/{image_proxy.widths[0]}")
+    assert response.status_code == 302
+    assert response.location == image_post.img_url
+
+
+def test_missing_image_resized_in_background(test_client, image_post, monkeypatch):
+    """
+    GIVEN a post whose header image is not in the cache
+    WHEN its image link is requested, then requested again once resized
+    THEN check the first request is redirected while every width is written
+    as a JPEG of that width, and the second one is served without a fetch
+    """
+    Image = pytest.importorskip("PIL.Image")
+    original = BytesIO()
+    Image.new("RGB", (2000, 1000), "teal").save(original, "PNG")
+    fetched = []
+    monkeypatch.setattr(
+        image_proxy,
+        "_fetch",
+        lambda img_url: fetched.append(img_url) or original.getvalue(),
+    )
+    monkeypatch.setattr(image_proxy, "enabled", True)
+    # Keep the futures of the background work to wait for it
+    futures = []
+    submit = image_proxy._submit
+    monkeypatch.setattr(
+        image_proxy, "_submit", lambda *args: futures.append(submit(*args))
+    )
+    link = f"/img/{image_post.id}/{image_proxy.widths[0]}"
+
+    response = test_client.get(link)
+    assert response.status_code == 302
+    assert response.location == image_post.img_url
+    futures[0].result(timeout=10)
+    for width in image_proxy.widths:
+        path = image_proxy.cache.get(image_proxy.key(image_post.img_url, width))
+        with Image.open(path) as image:
+            assert image.format == "JPEG"
+            assert image.width == width
+
+    response = test_client.get(link)
+    assert response.status_code == 200
+    assert response.mimetype == "image/jpeg"
+    response.close()
+    assert fetched == [image_post.img_url]
+    assert len(futures) == 1
@@ -0,0 +1,84 @@
+""" This file contains tests for the request metrics"""
+import json
+import logging
+
+from flask import Flask
+from flask import render_template_string
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from app.application.metrics import RequestMetrics
+
+
+def test_metrics_record_latency_sql_and_templates(caplog):
+    """
+    GIVEN an app with the request metrics enabled and every request slow
+    WHEN a view running two queries and rendering a template is requested
+    THEN check /metrics has its latency, queries and template time and the
+    request is logged with its statements
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["METRICS_ENABLED"] = True
+    app.config["METRICS_SLOW_REQUEST_SECONDS"] = 0
+    db = SQLAlchemy()
+    db.init_app(app)
+    RequestMetrics(app, db)
+
+    @app.route("/answer")
+    def answer():
+        db.session.execute(text("SELECT 1")).scalar()
+        value = db.session.execute(text("SELECT 42")).scalar()
+        return render_template_string("{{ value }}", value=value)
+
+    client = app.test_client()
+    with caplog.at_level(logging.WARNING, logger="app.application.metrics"):
+        response = client.get("/answer")
+        assert response.data == b"42"
+        # Like a WSGI server once the body is sent
+        response.close()
+    assert "Slow request GET /answer (answer)" in caplog.text
+    assert "SELECT 42" in caplog.text
+
+    metrics = client.get("/metrics").data.decode()
+    labels = 'endpoint="answer",method="GET",status="200"'
+    assert f'flask_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in metrics
+    assert f"flask_request_duration_seconds_count{{{labels}}} 1" in metrics
+    assert f"flask_sql_queries_total{{{labels}}} 2.0" in metrics
+    assert f"flask_template_render_seconds_total{{{labels}}}" in metrics
+
+
+def test_metrics_sum_the_workers(tmp_path):
+    """
+    GIVEN an app with the request metrics written to a directory shared with
+    another worker, which already served a request
+    WHEN the app serves the same route and is scraped
+    THEN check /metrics counts the requests of both workers
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["METRICS_ENABLED"] = True
+    app.config["METRICS_MULTIPROC_DIR"] = str(tmp_path)
+    db = SQLAlchemy()
+    db.init_app(app)
+    RequestMetrics(app, db)
+
+    @app.route("/answer")
+    def answer():
+        return str(db.session.execute(text("SELECT 42")).scalar())
+
+    labels = ("answer", "GET", "200")
+    other = RequestMetrics()
+    other.duration.observe(labels, 0.02)
+    other.sql_queries.inc(labels, 3)
+    (tmp_path / "1.json").write_text(
+        json.dumps({metric.name: metric.snapshot() for metric in other.metrics})
+    )
+
+    client = app.test_client()
+    client.get("/answer").close()
+
+    metrics = client.get("/metrics").data.decode()
+    labels = 'endpoint="answer",method="GET",status="200"'
+    assert f'flask_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in metrics
+    assert f"flask_sql_queries_total{{{labels}}} 4.0" in metrics
@@ -40,3 +40,12 @@ def test_new_comment_to_post_with_fixture(new_comment):
     assert new_comment.comment == "This is a new comment"
     assert new_comment.blog_post_id == 1
     assert new_comment.author_id == 1
+
+
+def test_new_user_avatar_hash(new_user):
+    """
+    GIVEN a User model
+    WHEN a new User is created
+    THEN check the gravatar hash of the email is computed once and stored
+    """
+    assert new_user.avatar_hash == "075ebc837b0145ee2ffcc5ee494b7438"
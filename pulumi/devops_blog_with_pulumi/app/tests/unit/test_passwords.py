@@ -0,0 +1,104 @@
+""" This file contains tests for the password hashing and the login throttle"""
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app.application import db
+from app.application import login_throttle
+from app.application import password_hasher
+from app.application.models import User
+from app.application.passwords import full_method
+from app.application.passwords import HashingBusy
+from app.application.passwords import PasswordHasher
+
+
+@pytest.fixture()
+def login_form(test_client, monkeypatch):
+    monkeypatch.setitem(test_client.application.config, "WTF_CSRF_ENABLED", False)
+    yield test_client
+    login_throttle.reset("127.0.0.1")
+    test_client.get("/logout")
+
+
+def test_needs_rehash():
+    """
+    GIVEN a hasher configured for pbkdf2 with 16 characters of salt
+    WHEN hashes made with other parameters are checked
+    THEN check only the hashes made with the configured ones are kept
+    """
+    hasher = PasswordHasher()
+    assert hasher.method == full_method("pbkdf2") == "pbkdf2:sha256:600000"
+    assert hasher.needs_rehash(generate_password_hash("x", "pbkdf2:sha256:1000", 16))
+    assert hasher.needs_rehash("pbkdf2:sha256:600000$short$0123")
+    assert hasher.needs_rehash("FlaskIsAwesome")
+    assert not hasher.needs_rehash("pbkdf2:sha256:600000$" + "s" * 16 + "$0123")
+
+
+def test_hashing_busy():
+    """
+    GIVEN a hasher whose waiting slots are all taken
+    WHEN a password is hashed
+    THEN check it is refused instead of waiting
+    """
+    hasher = PasswordHasher()
+    for _ in range(hasher.max_pending):
+        hasher._slots.acquire()
+    with pytest.raises(HashingBusy):
+        hasher.hash("FlaskIsAwesome")
+
+
+def test_client_ip_ignores_forged_forwarded_for(test_client):
+    """
+    GIVEN a client behind the ALB writing its own X-Forwarded-For entry
+    WHEN its IP is read for the login throttle
+    THEN check the address the ALB appended is used, not the forged one
+    """
+    app = test_client.application
+    headers = {"X-Forwarded-For": "1.2.3.4, 9.9.9.9"}
+    with app.test_request_context("/login", headers=headers):
+        assert login_throttle.client_ip() == "9.9.9.9"
+    with app.test_request_context("/login", environ_base={"REMOTE_ADDR": "8.8.8.8"}):
+        assert login_throttle.client_ip() == "8.8.8.8"
+
+
+def test_login_rehashes_old_password(login_form):
+    """
+    GIVEN a user whose password was hashed with older parameters
+    WHEN the user logs in
+    THEN check the password is hashed again with the configured parameters
+    """
+    old_hash = generate_password_hash("Secret123", "pbkdf2:sha256:500", 8)
+    user = User(email="rehash@example.com", name="Rehash", password=old_hash)
+    db.session.add(user)
+    db.session.commit()
+
+    response = login_form.post(
+        "/login", data={"email": "rehash@example.com", "password": "Secret123"}
+    )
+    assert response.status_code == 302
+    assert "/login" not in response.location
+    new_hash = db.session.get(User, user.id).password
+    assert new_hash != old_hash
+    assert not password_hasher.needs_rehash(new_hash)
+    assert password_hasher.verify(new_hash, "Secret123")
+
+
+def test_login_throttled_before_hashing(login_form, monkeypatch):
+    """
+    GIVEN a client that failed to log in the maximum number of times
+    WHEN it tries again with the right password
+    THEN check it gets a 429 and no password is checked
+    """
+    password = generate_password_hash("Secret123", "pbkdf2:sha256:500", 8)
+    db.session.add(User(email="throttled@example.com", name="T", password=password))
+    db.session.commit()
+    data = {"email": "throttled@example.com", "password": "wrong"}
+    for _ in range(login_throttle.max_attempts):
+        assert login_form.post("/login", data=data).status_code == 302
+
+    def verify(pwhash, password):
+        raise AssertionError("hashed a throttled login")
+
+    monkeypatch.setattr(password_hasher, "verify", verify)
+    response = login_form.post("/login", data={**data, "password": "Secret123"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
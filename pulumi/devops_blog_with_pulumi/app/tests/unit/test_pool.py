@@ -0,0 +1,61 @@
+""" This file contains tests for the connection pool configuration and metrics"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import exc
+
+from app.application.pool import InstrumentedQueuePool
+from app.application.pool import pool_stats
+from app.config import engine_options
+
+
+def test_engine_options_per_database(monkeypatch):
+    """
+    GIVEN MySQL and SQLite connection strings
+    WHEN the engine options are built
+    THEN check MySQL gets a health checked pool and env vars override the sizes
+    """
+    monkeypatch.setenv("DB_POOL_SIZE", "7")
+    options = engine_options("mysql+pymysql://u:p@host/db", pool_size=3, max_overflow=4)
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 4
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"]["connect_timeout"] == 5
+    assert engine_options("sqlite:///blog.db", pool_size=3, max_overflow=4) == {}
+
+
+def test_instrumented_pool_counts_checkouts_and_timeouts():
+    """
+    GIVEN an engine with an instrumented pool of a single connection
+    WHEN a second connection is requested while the first is checked out
+    THEN check the checkouts, the overflow and the timeout are recorded
+    """
+    engine = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    with engine.connect():
+        stats = pool_stats(engine)
+        assert stats["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = pool_stats(engine)
+    assert stats["pool"] == "InstrumentedQueuePool"
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+
+
+def test_pool_metrics_endpoint(test_client):
+    """
+    GIVEN a Flask application configured for testing
+    WHEN the '/pool-metrics' page is requested (GET)
+    THEN check the numbers of the default engine are returned
+    """
+    response = test_client.get("/pool-metrics")
+    assert response.status_code == 200
+    assert response.json["default"]["pool"]
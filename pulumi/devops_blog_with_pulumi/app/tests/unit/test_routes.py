@@ -1,4 +1,17 @@
 """ This file contains tests for the different routes"""
+from flask import current_app
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy import inspect
+
+from app.application import db
+from app.application.models import BlogPost
+from app.application.models import Comment
+from app.application.queries import load_comments_page
+from app.application.queries import load_post_page
+from app.application.queries import load_posts_page
+from app.application.views.auth import load_user
+from app.application.views.auth import user_cache
 
 
 def test_home_page(test_client):
@@ -71,6 +84,135 @@ def test_contact_get_page(test_client):
     assert b"Have questions? I have answers." in response.data
 
 
+def test_reader_mode_skips_admin_views():
+    """
+    GIVEN an application serving in reader mode
+    WHEN the views are registered
+    THEN check the public and login views are there but not the admin ones
+    """
+    from app.application.views import register_views
+
+    app = Flask(__name__)
+    register_views(app, "reader")
+    assert "blog" in app.blueprints
+    assert "auth" in app.blueprints
+    assert "admin" not in app.blueprints
+    assert app.jinja_env.globals["admin_enabled"] is False
+
+
+def test_startup_profile(test_client):
+    """
+    GIVEN a Flask application configured for testing
+    WHEN the startup profile is read
+    THEN check every extension and the views were timed
+    """
+    steps = current_app.extensions["startup_profile"].steps
+    for step in ("sqlalchemy", "ckeditor", "migrate", "views"):
+        assert steps[step] >= 0
+
+
 ##################################################################################
 # TEST SAVING USERS TO THE DB
 ##################################################################################
+
+
+##################################################################################
+# TEST POST PAGES
+##################################################################################
+
+
+def test_post_page_and_comment_pages(test_client, monkeypatch, make_post):
+    """
+    GIVEN a published post with three comments in the DB
+    WHEN the post page and the pages of its comments are loaded
+    THEN check the authors come back already loaded and the comments are paged
+    """
+    post = make_post("Slug Post", post_views=0, post_likes=0)
+    db.session.add(post)
+    db.session.commit()
+    for number in range(1, 4):
+        db.session.add(
+            Comment(comment=f"Nice post {number}", blog_post_id=post.id, author_id=2)
+        )
+    db.session.commit()
+    db.session.expunge_all()
+
+    loaded = load_post_page("slug-post")
+    assert "author" not in inspect(loaded).unloaded
+
+    first = load_comments_page(loaded.id, per_page=2)
+    assert [c.comment for c in first.comments] == ["Nice post 1", "Nice post 2"]
+    assert "comment_author" not in inspect(first.comments[0]).unloaded
+    assert first.comments[0].comment_author.name == "Test User 2"
+    last = load_comments_page(loaded.id, after=first.next, per_page=2)
+    assert [c.comment for c in last.comments] == ["Nice post 3"]
+    assert last.next is None
+
+    monkeypatch.setitem(test_client.application.config, "COMMENTS_PER_PAGE", 2)
+    response = test_client.get("/post/slug-post")
+    assert response.status_code == 200
+    assert b"Slug Post body." in response.data
+    assert b"Nice post 2" in response.data
+    assert b"Nice post 3" not in response.data
+    assert b"Load more comments" in response.data
+
+    response = test_client.get(f"/post/slug-post/comments?after={first.next}")
+    assert response.json["next"] is None
+    assert [c["comment"] for c in response.json["comments"]] == ["Nice post 3"]
+    assert response.json["comments"][0]["author"] == "Test User 2"
+
+
+def test_home_page_keyset_pagination(test_client, make_post):
+    """
+    GIVEN more published posts than fit in a page
+    WHEN the home page and its older/newer pages are requested
+    THEN check the posts are paged newest first with only the card columns loaded
+    """
+    for number in range(1, 4):
+        db.session.add(make_post(f"Paged Post {number}"))
+    db.session.commit()
+    db.session.expunge_all()
+    query = BlogPost.query.filter(BlogPost.title.like("Paged Post %"))
+
+    first = load_posts_page(query, per_page=2)
+    assert [post.title for post in first.posts] == ["Paged Post 3", "Paged Post 2"]
+    assert first.newer is None
+    assert "body" in inspect(first.posts[0]).unloaded
+    assert "author" not in inspect(first.posts[0]).unloaded
+
+    second = load_posts_page(query, before=first.older, per_page=2)
+    assert [post.title for post in second.posts] == ["Paged Post 1"]
+    assert second.older is None
+
+    back = load_posts_page(query, after=second.newer, per_page=2)
+    assert [post.title for post in back.posts] == ["Paged Post 3", "Paged Post 2"]
+    assert back.newer is None
+
+    response = test_client.get(f"/?before={first.older}")
+    assert response.status_code == 200
+    assert b"Paged Post 1" in response.data
+    assert b"Paged Post 3" not in response.data
+
+
+def test_load_user_is_cached(test_client):
+    """
+    GIVEN a user already loaded by Flask-Login
+    WHEN the same user is loaded again within the cache TTL
+    THEN check no query is sent to the DB and the user is usable
+    """
+    user_cache.clear()
+    assert load_user("2").name == "Test User 2"
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        cached_user = load_user("2")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert statements == []
+    assert cached_user.name == "Test User 2"
+    assert cached_user.avatar_hash == "01c37bf9a0689a959f25f5687137a400"
@@ -0,0 +1,63 @@
+""" This file contains tests for the read replica routing"""
+import pytest
+from flask import Flask
+from flask import request
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import column
+from sqlalchemy import table
+from sqlalchemy import text
+from sqlalchemy import update
+
+from app.application.routing import ReplicaRouter
+from app.application.routing import RoutingSession
+from app.application.routing import use_reader
+
+
+@pytest.fixture()
+def replica_client(tmp_path):
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = "temp_key"
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'writer.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {"reader": f"sqlite:///{tmp_path / 'reader.db'}"}
+    db = SQLAlchemy(session_options={"class_": RoutingSession})
+    db.init_app(app)
+    ReplicaRouter(app)
+
+    @app.route("/source", methods=["GET", "POST"])
+    @use_reader
+    def source():
+        if request.method == "POST":
+            db.session.execute(
+                update(table("source", column("name"))).values(name="written")
+            )
+            db.session.commit()
+        return db.session.execute(text("SELECT name FROM source")).scalar()
+
+    with app.app_context():
+        for bind, name in ((None, "writer"), ("reader", "reader")):
+            with db.engines[bind].begin() as connection:
+                connection.execute(text("CREATE TABLE source (name TEXT)"))
+                connection.execute(text(f"INSERT INTO source VALUES ('{name}')"))
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_reads_go_to_reader_and_writes_to_writer(replica_client):
+    """
+    GIVEN an app with a writer and a reader bind
+    WHEN a read only view is requested with GET and then with POST
+    THEN check the GET reads from the reader and the POST writes to the writer
+    """
+    assert replica_client.get("/source").data == b"reader"
+    assert replica_client.post("/source").data == b"written"
+
+
+def test_client_sticks_to_writer_after_writing(replica_client):
+    """
+    GIVEN a client that just wrote to the writer
+    WHEN it requests a read only view
+    THEN check it reads its own write from the writer
+    """
+    replica_client.post("/source")
+    assert replica_client.get("/source").data == b"written"
@@ -0,0 +1,53 @@
+""" This file contains tests for the schema migration commands"""
+from pathlib import Path
+
+from flask import current_app
+
+from app.application import init_app
+from app.application import post_counters
+from app.application.schema import head_revision
+from app.config import TestConfig
+
+MIGRATIONS = Path(__file__).parents[2] / "migrations"
+
+
+def test_schema_wait_times_out_on_unmigrated_db(test_client, monkeypatch):
+    """
+    GIVEN a DB created without the migrations
+    WHEN the app waits for the schema
+    THEN check it gives up after the timeout instead of migrating
+    """
+    monkeypatch.setattr(current_app.extensions["migrate"], "directory", str(MIGRATIONS))
+    head = head_revision()
+    assert any((MIGRATIONS / "versions").glob(f"{head}_*.py"))
+
+    runner = current_app.test_cli_runner()
+    result = runner.invoke(args=["schema", "wait", "--timeout", "0", "--interval", "0"])
+    assert result.exit_code == 1
+    assert f"Schema still at None instead of {head}" in result.output
+
+
+def test_schema_commands_in_reader_mode(test_client, monkeypatch):
+    """
+    GIVEN an app started with APP_MODE=reader
+    WHEN boot.sh runs the schema commands
+    THEN check they are registered and wait for the schema
+    """
+
+    class ReaderConfig(TestConfig):
+        APP_MODE = "reader"
+
+    # The counters flush through the last app they were set up with, keep
+    # them on the app of the other tests
+    monkeypatch.setattr(post_counters, "_app", post_counters._app)
+    reader_app = init_app(ReaderConfig)
+    with reader_app.app_context():
+        monkeypatch.setattr(
+            reader_app.extensions["migrate"], "directory", str(MIGRATIONS)
+        )
+        runner = reader_app.test_cli_runner()
+        result = runner.invoke(
+            args=["schema", "wait", "--timeout", "0", "--interval", "0"]
+        )
+    assert "No such command" not in result.output
+    assert "Schema still at None instead of" in result.output
@@ -0,0 +1,84 @@
+""" This file contains tests for the full-text search"""
+from app.application import db
+from app.application import search_index
+from app.application.models import SearchPosting
+from app.application.search import tokenize
+
+
+def test_tokenize_strips_markup_and_stop_words():
+    """
+    GIVEN the HTML body of a post
+    WHEN it is tokenized
+    THEN check the tags, entities and stop words are gone and the terms are
+    lower case
+    """
+    assert tokenize("<p>The <b>Kubernetes</b> operator, in Go!</p>") == [
+        "kubernetes",
+        "operator",
+        "go",
+    ]
+    assert tokenize("<p>Pulumi&nbsp;stacks &amp; Aurora caf&eacute;</p>") == [
+        "pulumi",
+        "stacks",
+        "aurora",
+        "cafe",
+    ]
+
+
+def test_tokenize_folds_case_and_accents():
+    """
+    GIVEN words differing only by accents or special casing
+    WHEN they are tokenized
+    THEN check each pair gives one term, the primary key of the postings
+    """
+    assert tokenize("résumé resume Straße strasse ÉCOLE école") == [
+        "resume",
+        "resume",
+        "strasse",
+        "strasse",
+        "ecole",
+        "ecole",
+    ]
+
+
+def test_search_ranks_and_follows_post_changes(test_client, as_admin, make_post):
+    """
+    GIVEN two published posts indexed when they were saved
+    WHEN they are searched, then one is turned into a draft and one deleted
+    THEN check the title match ranks first and the index follows the changes
+    """
+    pulumi = make_post(
+        "Searchable Pulumi Stacks",
+        subtitle="Stacks for every environment",
+        body="<p>Create an Aurora cluster with Pulumi.</p>",
+    )
+    aurora = make_post(
+        "Searchable Aurora Readers",
+        subtitle="Scaling reads",
+        body="<p>Reader endpoints, also from Pulumi.</p>",
+    )
+    for post in (pulumi, aurora):
+        db.session.add(post)
+        search_index.index_post(post)
+    db.session.commit()
+
+    ranked = [post_id for post_id, _ in search_index.search("pulumi")]
+    assert ranked == [pulumi.id, aurora.id]
+    best_id, _ = search_index.search("aurora readers")[0]
+    assert best_id == aurora.id
+
+    response = test_client.get("/search?q=pulumi+stacks")
+    assert response.status_code == 200
+    assert b"Searchable Pulumi Stacks" in response.data
+
+    aurora.is_draft = True
+    search_index.index_post(aurora)
+    db.session.commit()
+    assert [post_id for post_id, _ in search_index.search("pulumi")] == [pulumi.id]
+
+    assert test_client.get(f"/delete/{pulumi.id}").status_code == 403
+    with as_admin():
+        response = test_client.get(f"/delete/{pulumi.id}")
+    assert response.status_code == 302
+    assert search_index.search("pulumi") == []
+    assert SearchPosting.query.filter_by(post_id=pulumi.id).count() == 0
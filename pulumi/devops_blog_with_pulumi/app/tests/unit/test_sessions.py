@@ -0,0 +1,109 @@
+""" This file contains tests for the server-side sessions"""
+import re
+
+import pytest
+from flask import g
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+
+from app.application import db
+from app.application import login_throttle
+from app.application.models import ServerSessionRecord
+from app.application.models import User
+from app.application.sessions import SessionStore
+
+
+@pytest.fixture()
+def db_sessions(test_client, monkeypatch):
+    app = test_client.application
+    monkeypatch.setattr(app, "session_interface", app.session_interface)
+    monkeypatch.setitem(app.extensions, "session_store", SessionStore())
+    monkeypatch.setitem(app.config, "SESSION_BACKEND", "db")
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    monkeypatch.setitem(app.config, "USER_CACHE_TTL", 0)
+    SessionStore(app, db)
+    yield test_client
+    login_throttle.reset("127.0.0.1")
+    test_client.delete_cookie("session")
+
+
+def count_sessions():
+    return db.session.scalar(select(func.count()).select_from(ServerSessionRecord))
+
+
+def test_db_session_keeps_user_profile(db_sessions):
+    """
+    GIVEN the "db" session backend
+    WHEN a user logs in, browses and logs out
+    THEN check the cookie only holds an id, the user is not queried again
+    and the session row is removed on logout
+    """
+    password = generate_password_hash("Secret123", "pbkdf2:sha256:1000", 16)
+    db.session.add(User(email="session@example.com", name="Sess", password=password))
+    db.session.commit()
+
+    response = db_sessions.post(
+        "/login", data={"email": "session@example.com", "password": "Secret123"}
+    )
+    assert response.status_code == 302
+    assert count_sessions() == 1
+    cookie = db_sessions.get_cookie("session").value
+    assert "." in cookie and len(cookie) < 100
+
+    # First page loads the user and keeps its profile in the session
+    assert db_sessions.get("/about").status_code == 200
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, many):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = db_sessions.get("/about")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert b"Log Out" in response.data
+    assert not [s for s in statements if "FROM users" in s]
+    assert not [s for s in statements if s.startswith(("INSERT", "UPDATE"))]
+
+    db_sessions.get("/logout")
+    assert count_sessions() == 0
+
+
+def test_anonymous_session_stays_in_cookie(db_sessions, monkeypatch):
+    """
+    GIVEN the "db" session backend
+    WHEN an anonymous visitor opens the login form, then logs in with it
+    THEN check the CSRF token is kept in the cookie and only the login
+    stores a session row
+    """
+    monkeypatch.setitem(db_sessions.application.config, "WTF_CSRF_ENABLED", True)
+    password = generate_password_hash("Secret123", "pbkdf2:sha256:1000", 16)
+    db.session.add(User(email="anonymous@example.com", name="Anon", password=password))
+    db.session.commit()
+
+    # The app context of the tests outlives the requests, drop the token an
+    # earlier request left in g so this one is put in the session
+    g.pop("csrf_token", None)
+    response = db_sessions.get("/login")
+    assert response.status_code == 200
+    assert count_sessions() == 0
+    token = re.search(rb'name="csrf_token"[^>]*value="([^"]+)"', response.data)
+
+    response = db_sessions.post(
+        "/login",
+        data={
+            "csrf_token": token.group(1).decode(),
+            "email": "anonymous@example.com",
+            "password": "Secret123",
+        },
+    )
+    assert response.status_code == 302
+    assert "/login" not in response.location
+    assert count_sessions() == 1
+
+    db_sessions.get("/logout")
+    assert count_sessions() == 0
@@ -0,0 +1,37 @@
+""" This file contains tests for the streamed post pages"""
+from app.application import db
+from app.application import post_counters
+from app.application.models import Comment
+
+
+def test_post_page_streamed(test_client, monkeypatch, make_post):
+    """
+    GIVEN a published post with a comment and POST_STREAMING enabled
+    WHEN the post page is requested
+    THEN check the head and the post are sent in chunks before the comments
+    """
+    post = make_post("Streamed Post", post_views=0, post_likes=0)
+    db.session.add(post)
+    db.session.commit()
+    db.session.add(
+        Comment(comment="Streamed comment", blog_post_id=post.id, author_id=2)
+    )
+    db.session.commit()
+    monkeypatch.setitem(test_client.application.config, "POST_STREAMING", True)
+
+    response = test_client.get("/post/streamed-post", buffered=False)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers["X-Accel-Buffering"] == "no"
+    assert "Content-Length" not in response.headers
+    assert response.headers["ETag"]
+
+    chunks = list(response.iter_encoded())
+    response.close()
+    assert b"<head>" in chunks[0]
+    assert b"Streamed Post body." not in chunks[0]
+    body_chunk = next(i for i, c in enumerate(chunks) if b"Streamed Post body." in c)
+    comment_chunk = next(i for i, c in enumerate(chunks) if b"Streamed comment" in c)
+    assert body_chunk < comment_chunk
+    assert b"stream:flush" not in b"".join(chunks)
+    post_counters.flush()
@@ -98,9 +98,23 @@ class RDSComponent(pulumi.ComponentResource):
             },
         )
 
+        # Reader endpoint, used by the app for the reads of read only views
+        rds_reader_hostname_ssm = aws.ssm.Parameter(
+            f"{self.project_name}-rds-reader-hostname-ssm-parameter",
+            type="String",
+            name=f"/prod/{self.project_name}/db-reader-hostname",
+            value=self.rds_aurora_cluster.reader_endpoint,
+            opts=pulumi.ResourceOptions(parent=self),
+            tags={
+                **self.base_tags,
+                "Name": f"{self.project_name}-rds-aurora-cluster-reader-hostname",
+            },
+        )
+
         self.register_outputs(
             {
                 "rds-aurora-cluster-endpoint": self.rds_aurora_cluster.endpoint,
+                "rds-aurora-cluster-reader-endpoint": self.rds_aurora_cluster.reader_endpoint,
                 "rds-aurora-cluster-master_user_secret_arn": self.rds_aurora_cluster.master_user_secrets[
                     0
                 ][